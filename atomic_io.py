@@ -0,0 +1,22 @@
+import os
+import json
+from contextlib import contextmanager
+
+# Write to a temporary sibling and rename over the target, so readers never see a partial file.
+# The suffix is kept so writers that pick a format from the extension (pandas) still work.
+@contextmanager
+def atomic_output(path):
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    tmp_path = os.path.join(directory, f".{stem}.{os.getpid()}.tmp{ext}")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+def write_json_atomic(path, data):
+    with atomic_output(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
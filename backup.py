@@ -1,10 +1,19 @@
+import os
 import sys
-import pdfplumber
 import json
 import re
-import pandas as pd
+import time
+import signal
+import logging
+import argparse
+import threading
 import traceback
-from collections import defaultdict
+from collections import defaultdict, Counter
+from contextlib import contextmanager, ExitStack
+from pdf_source import open_pdf_stream, open_fitz_document
+from shards import parse_page_range, page_in_range, resolve_page_range, shard_document, save_shard, count_pages
+
+logger = logging.getLogger(__name__)
 
 
 # Group words into lines
@@ -30,81 +39,417 @@ def detect_font_style(font_name):
     else:
         return "Regular"
 
-# Extract structured info
-def extract_pdf_to_json(pdf_path):
-    formatted_data = []
+# Detect font style based on fontname, majority vote over chars
+def detect_font_style_from_chars(chars):
+    styles = []
+    for c in chars:
+        font_name = c.get("fontname", "").lower()
+        try:
+            font_number = int(re.search(r'-(\d+)', font_name).group(1))
+        except (AttributeError, ValueError):
+            font_number = None
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf.pages, start=1):
-            words = page.extract_words(
-                keep_blank_chars=True,
-                x_tolerance=1,
-                y_tolerance=1,
-                use_text_flow=True
-            )
-            grouped_lines = group_words_by_line(words)
-            chars = page.chars
+        is_bold = (font_number is not None and font_number > 45) or "bold" in font_name or "bd" in font_name
+        is_italic = "italic" in font_name or "oblique" in font_name or "it" in font_name
+
+        if is_bold and is_italic:
+            styles.append("Bold Italic")
+        elif is_bold:
+            styles.append("Bold")
+        elif is_italic:
+            styles.append("Italic")
+        else:
+            styles.append("Regular")
+
+    if styles:
+        return Counter(styles).most_common(1)[0][0]
+    else:
+        return "Unknown"
+
+# Font annotation levels, from cheapest to most detailed:
+# none (no char work), line (first char of each line), word (per-word font), span (per-word font runs)
+FONT_DETAIL_LEVELS = ("none", "line", "word", "span")
+
+# Chars inside a word's bounding box
+def get_word_chars(word, chars):
+    return [
+        c for c in chars
+        if c['x0'] >= word['x0'] and c['x1'] <= word['x1'] and
+            c['top'] >= word['top'] and c['bottom'] <= word['bottom']
+    ]
+
+# Get font info for a single word
+def get_word_font_info(word_chars):
+    if not word_chars:
+        return {"fontname": "", "size": None, "style": "Unknown"}
+
+    return {
+        "fontname": word_chars[0].get("fontname", ""),
+        "size": word_chars[0].get("size", None),
+        "style": detect_font_style_from_chars(word_chars)
+    }
+
+# Split a word into runs of consecutive chars that share fontname and size
+def get_word_spans(word_chars):
+    spans = []
+    for c in sorted(word_chars, key=lambda c: c['x0']):
+        fontname = c.get("fontname", "")
+        size = c.get("size", None)
+        if spans and spans[-1]["fontname"] == fontname and spans[-1]["size"] == size:
+            spans[-1]["text"] += c["text"]
+            spans[-1]["x1"] = c["x1"]
+        else:
+            spans.append({"text": c["text"], "x0": c["x0"], "x1": c["x1"], "fontname": fontname, "size": size})
+
+    for span in spans:
+        span["style"] = detect_font_style_from_chars([span])
+    return spans
+
+# Running headers/footers are looked for within this distance (pt) of the top and bottom edges
+FURNITURE_MARGIN = 60.0
+FURNITURE_BAND = 3.0
+
+# Signature of a running header/footer line: whitespace-free text with a leading or trailing
+# page number collapsed to "#", plus an approximate y-band
+def furniture_signature(text, top, band=FURNITURE_BAND):
+    compact = re.sub(r"\s+", "", text).lower()
+    return re.sub(r"^\d+|\d+$", "#", compact), round(top / band)
+
+# Cheap first pass over one page: margin lines built straight from page.chars, no word segmentation
+def page_margin_signatures(page, margin=FURNITURE_MARGIN):
+    rows = defaultdict(list)
+    for c in page.chars:
+        if c["top"] <= margin or c["bottom"] >= page.height - margin:
+            rows[round(c["top"])].append(c)
+
+    signatures = set()
+    for row_chars in rows.values():
+        text = "".join(c["text"] for c in sorted(row_chars, key=lambda c: c["x0"]))
+        if text.strip():
+            signatures.add(furniture_signature(text, min(c["top"] for c in row_chars)))
+    return signatures
+
+# Signatures of margin lines that recur on at least min_ratio of the pages (and at least two pages)
+def detect_furniture(pages, min_ratio=0.5, margin=FURNITURE_MARGIN):
+    counts = defaultdict(int)
+    for page in pages:
+        for signature in page_margin_signatures(page, margin):
+            counts[signature] += 1
+
+    min_pages = max(2, min_ratio * len(pages))
+    return {signature for signature, count in counts.items() if count >= min_pages}
+
+# Side-channel record for a line dropped as running header/footer
+def furniture_block(page_num, line_text, top, bottom):
+    return {"page": page_num, "line_text": line_text, "top": top, "bottom": bottom}
+
+# Slack (pt) above and below a table region's crop box, so the anchor lines are never clipped
+REGION_PAD = 2.0
+
+# Word segmentation shared by extract_page_blocks and the region scan: the page's lines top to bottom, each
+# a list of its words left to right. Words carry their content-stream "order" (and "chars" with return_chars).
+def segment_page_lines(page, return_chars=False):
+    words = page.extract_words(
+        keep_blank_chars=True,
+        x_tolerance=1,
+        y_tolerance=1,
+        use_text_flow=True,
+        return_chars=return_chars
+    )
+    # With use_text_flow the words come in content-stream order, which page.chars also follows
+    for order, word in enumerate(words):
+        word["order"] = order
+    grouped_lines = group_words_by_line(words)
+    return [sorted(grouped_lines[top_key], key=lambda w: w['x0']) for top_key in sorted(grouped_lines)]
+
+def words_line_text(line_words):
+    return " ".join([w['text'] for w in line_words])
+
+# Crop box of the request model's table on one page. The anchors are matched on the same line_text that
+# extract_by_line_text sees: the start anchor bounds the first page from above, the end anchor the last page
+# from below. The box always spans the full page width, so no column outside the ruling lines is lost, and
+# later pages keep their top so repeated header rows are still skipped by count. Returns (bbox, or None when
+# the page holds none of the region, started, ended).
+def table_region_bbox(page, start_pattern, end_pattern, started=False):
+    lines = segment_page_lines(page)
+    top, bottom = 0, page.height
+    if not started:
+        start_index = next(
+            (i for i, line_words in enumerate(lines) if re.search(start_pattern, words_line_text(line_words))), None
+        )
+        if start_index is None:
+            return None, False, False
+        top = min(w['top'] for w in lines[start_index]) - REGION_PAD
+        lines = lines[start_index + 1:]
+
+    end = next((line_words for line_words in lines if re.search(end_pattern, words_line_text(line_words))), None)
+    if end is not None:
+        bottom = max(w['bottom'] for w in end) + REGION_PAD
+
+    bbox = (0, max(top, 0), page.width, min(bottom, page.height))
+    return bbox, True, end is not None
+
+class PageTimeout(Exception):
+    pass
+
+# pdfplumber re-raises errors from inside pdfminer wrapped in its own exception, so walk the chain
+def is_page_timeout(error):
+    while error is not None:
+        if isinstance(error, PageTimeout):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+# Raise PageTimeout when the enclosed work exceeds its budget (main thread on POSIX only, otherwise no limit)
+@contextmanager
+def page_time_budget(seconds):
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def on_timeout(signum, frame):
+        raise PageTimeout()
+
+    previous_handler = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
 
-            for top_key in sorted(grouped_lines):
-                line_words = sorted(grouped_lines[top_key], key=lambda w: w['x0'])
-                line_text = " ".join([w['text'] for w in line_words])
+# Extract the line blocks of a single pdfplumber page
+# Lines matching a furniture signature are dropped before any char work (kept in furniture_lines if given)
+# single_pass takes fonts from the chars each word was segmented from instead of searching page.chars
+# by bounding box. On the bundled FTSE PDF this gives the char search's output at the line, word and span
+# levels (parity_check.py); other layouts are not checked.
+def extract_page_blocks(page, page_num, furniture=None, furniture_lines=None, font_detail="line", single_pass=False):
+    if font_detail not in FONT_DETAIL_LEVELS:
+        raise ValueError(f"Unknown font_detail '{font_detail}', expected one of {', '.join(FONT_DETAIL_LEVELS)}")
+    font_level = FONT_DETAIL_LEVELS.index(font_detail)
+    single_pass = single_pass and font_level > 0
 
-                # Bounding box
-                x0 = min(w['x0'] for w in line_words)
-                x1 = max(w['x1'] for w in line_words)
-                top = min(w['top'] for w in line_words)
-                bottom = max(w['bottom'] for w in line_words)
+    page_blocks = []
 
+    chars = page.chars if font_level > 0 and not single_pass else []
+
+    for line_words in segment_page_lines(page, return_chars=single_pass):
+        line_text = words_line_text(line_words)
+
+        # Bounding box
+        x0 = min(w['x0'] for w in line_words)
+        x1 = max(w['x1'] for w in line_words)
+        top = min(w['top'] for w in line_words)
+        bottom = max(w['bottom'] for w in line_words)
+
+        if furniture and furniture_signature(line_text, top) in furniture:
+            if furniture_lines is not None:
+                furniture_lines.append(furniture_block(page_num, line_text, top, bottom))
+            continue
+
+        line_block = {
+            "page": page_num,
+            "line_text": line_text,
+            "line_spacing": 20.0,
+            "top": top,
+            "bottom": bottom,
+            "bounding_box": {
+                "x0": x0,
+                "x1": x1,
+                "top": top,
+                "bottom": bottom,
+                "width": x1 - x0,
+                "height": bottom - top
+            },
+            "words": [
+                {
+                    "text": w["text"],
+                    "x0": w["x0"],
+                    "x1": w["x1"],
+                    "top": w["top"],
+                    "bottom": w["bottom"]
+                }
+                for w in line_words
+            ]
+        }
+
+        if font_level > 0:
+            if single_pass:
+                # The line's first char in stream order is the first char of its earliest word
+                line_chars = min(line_words, key=lambda w: w["order"])["chars"][:1]
+            else:
                 # Get all chars in this line range (bounding box match)
                 line_chars = [
                     c for c in chars
                     if c['x0'] >= x0 and c['x1'] <= x1 and c['top'] >= top and c['bottom'] <= bottom
                 ]
 
-                if line_chars:
-                    fontname = line_chars[0].get("fontname", "")
-                    size = line_chars[0].get("size", None)
-                    font_style = detect_font_style(fontname)
-                else:
-                    fontname = ""
-                    size = None
-                    font_style = "Unknown"
-
-                line_block = {
-                    "page": page_num,
-                    "line_text": line_text,
-                    "line_spacing": 20.0,
-                    "top": top,
-                    "bottom": bottom,
-                    "bounding_box": {
-                        "x0": x0,
-                        "x1": x1,
-                        "top": top,
-                        "bottom": bottom,
-                        "width": x1 - x0,
-                        "height": bottom - top
-                    },
-                    "font": {
-                        "fontname": fontname,
-                        "size": size,
-                        "style": font_style
-                    },
-                    "words": [
-                        {
-                            "text": w["text"],
-                            "x0": w["x0"],
-                            "x1": w["x1"],
-                            "top": w["top"],
-                            "bottom": w["bottom"]
-                        }
-                        for w in line_words
-                    ]
-                }
+            if line_chars:
+                fontname = line_chars[0].get("fontname", "")
+                size = line_chars[0].get("size", None)
+                font_style = detect_font_style(fontname)
+            else:
+                fontname = ""
+                size = None
+                font_style = "Unknown"
 
-                formatted_data.append(line_block)
+            line_block["font"] = {
+                "fontname": fontname,
+                "size": size,
+                "style": font_style
+            }
 
+            # A word box lies inside its line box, so the line's chars are the only candidates
+            for word, source_word in zip(line_block["words"], line_words) if font_level > 1 else []:
+                word_chars = source_word["chars"] if single_pass else get_word_chars(word, line_chars)
+                word["font"] = get_word_font_info(word_chars)
+                if font_level > 2:
+                    word["spans"] = get_word_spans(word_chars)
+
+        page_blocks.append(line_block)
+
+    return page_blocks
+
+# Re-extract a page with the PyMuPDF line extractor (the one fitz.py uses), marking its lines as degraded
+def extract_page_blocks_fallback(fallback_doc, page_num, furniture=None, furniture_lines=None):
+    from pymupdf_blocks import extract_page_blocks as extract_page_blocks_fitz
+
+    page_blocks = []
+    for block in extract_page_blocks_fitz(fallback_doc[page_num - 1], page_num):
+        if furniture and furniture_signature(block["line_text"], block["top"]) in furniture:
+            if furniture_lines is not None:
+                furniture_lines.append(furniture_block(page_num, block["line_text"], block["top"], block["bottom"]))
+            continue
+        page_blocks.append({**block, "line_spacing": 20.0, "quality": "degraded"})
+    return page_blocks
+
+# Stand-in for a page that could not be extracted at all, so it shows up as degraded instead of vanishing
+def skipped_page_block(page_num, reason):
+    return {
+        "page": page_num,
+        "line_text": "",
+        "line_spacing": 20.0,
+        "top": 0.0,
+        "bottom": 0.0,
+        "words": [],
+        "quality": "degraded",
+        "skipped": reason
+    }
+
+# Extract structured info (source: path, bytes, file object or mmap)
+# A page that takes longer than page_timeout seconds is re-extracted with PyMuPDF
+# drop_furniture removes running headers/footers; pass a list as furniture_lines to keep them aside
+# font_detail picks the font annotation level: "none", "line" (default), "word" or "span"
+# single_pass reads fonts off the word segmentation rather than a separate char search
+# region=(start_pattern, end_pattern) keeps only the table between those anchors and stops after it (see table_region_bbox)
+# pages limits extraction to a 1-based inclusive (first, last) range; last may be None for "to the end"
+# journal (a checkpoint.PageJournal) records every finished page; pages it already holds are replayed
+def extract_pdf_to_json(source, page_timeout=None, drop_furniture=False, furniture_lines=None, font_detail="line",
+                        pages=None, single_pass=False, region=None, journal=None):
+    formatted_data = []
+    started = ended = False
+    for record in journal.records if journal is not None else []:
+        formatted_data.extend(record["blocks"])
+        if furniture_lines is not None:
+            furniture_lines.extend(record.get("furniture", []))
+        if region:
+            _, started, ended = split_region(record["blocks"], *region, started)
+    if ended:
+        return formatted_data
+
+    for page_num, page_blocks in iter_pdf_pages(source, page_timeout, drop_furniture, furniture_lines, font_detail, pages,
+                                                single_pass, region, resume_after=journal and journal.last_page,
+                                                region_started=started):
+        formatted_data.extend(page_blocks)
+        if journal is not None:
+            record = {"page": page_num, "blocks": page_blocks}
+            if furniture_lines is not None:
+                record["furniture"] = [block for block in furniture_lines if block["page"] == page_num]
+            journal.commit(record)
+    if journal is not None:
+        journal.flush()
     return formatted_data
 
+# Same as extract_pdf_to_json, but yields (page_num, line blocks) one page at a time
+# resume_after skips the pages up to and including that one (they still count for furniture detection);
+# region_started says the region began on one of them
+def iter_pdf_pages(source, page_timeout=None, drop_furniture=False, furniture_lines=None, font_detail="line",
+                   pages=None, single_pass=False, region=None, resume_after=None, region_started=False):
+    import pdfplumber
+
+    with ExitStack() as stack:
+        stream = stack.enter_context(open_pdf_stream(source))
+        pdf = stack.enter_context(pdfplumber.open(stream))
+        fallback_doc = None
+        selected_pages = [
+            (page_num, page) for page_num, page in enumerate(pdf.pages, start=1)
+            if page_in_range(page_num, pages)
+        ]
+        furniture = detect_furniture([page for _, page in selected_pages]) if drop_furniture else None
+
+        in_region, region_ended = region_started, False
+        for page_num, page in selected_pages:
+            if resume_after is not None and page_num <= resume_after:
+                continue
+            started = time.perf_counter()
+            backend = "pdfplumber"
+            try:
+                with page_time_budget(page_timeout):
+                    target = page
+                    if region:
+                        bbox, in_region, region_ended = table_region_bbox(page, *region, in_region)
+                        if bbox is None:
+                            target = None
+                        elif bbox != (0, 0, page.width, page.height):
+                            target = page.within_bbox(bbox)
+                        if target is not None:
+                            logger.info(f"Page {page_num}: table region keeps {len(target.chars)}/{len(page.chars)} chars")
+                    page_blocks = extract_page_blocks(target, page_num, furniture, furniture_lines, font_detail,
+                                                      single_pass) if target is not None else None
+            except Exception as e:
+                if not is_page_timeout(e):
+                    raise
+                page.close()
+                logger.warning(f"⚠️ Page {page_num} exceeded {page_timeout}s, falling back to PyMuPDF")
+                backend = "pymupdf"
+                try:
+                    if fallback_doc is None:
+                        fallback_doc = stack.enter_context(open_fitz_document(source))
+                    page_blocks = extract_page_blocks_fallback(fallback_doc, page_num, furniture, furniture_lines)
+                except ModuleNotFoundError as missing:
+                    if missing.name != "pymupdf":
+                        raise
+                    logger.error(f"❌ PyMuPDF is not installed, page {page_num} is skipped")
+                    backend = "skipped"
+                    page_blocks = [skipped_page_block(page_num, f"exceeded {page_timeout}s, PyMuPDF not installed")]
+                if region:
+                    # The whole page came back uncropped; only the region anchors are needed from it
+                    _, in_region, region_ended = split_region(page_blocks, *region, in_region)
+
+            if page_blocks is None:
+                page.close()
+                continue
+            logger.info(f"Page {page_num}: {len(page_blocks)} lines in {time.perf_counter() - started:.3f}s ({backend})")
+            yield page_num, page_blocks
+            if region_ended:
+                break
+
+# Split one page's line blocks at the table region's anchors, carrying whether the region has started
+# across pages. Returns (the page's region lines, started, ended), matching extract_by_line_text.
+def split_region(page_blocks, start_pattern, end_pattern, started=False):
+    region = []
+    for block in page_blocks:
+        line_text = block.get("line_text", "")
+        if not started:
+            started = bool(re.search(start_pattern, line_text))
+            if started:
+                region.append(block)
+            continue
+        region.append(block)
+        if re.search(end_pattern, line_text):
+            return region, True, True
+    return region, started, False
+
 # Extract lines based on regex patterns
 def extract_by_line_text(data, start_pattern, end_pattern, inclusive=True):
     start_idx = end_idx = None
@@ -124,6 +469,64 @@ def extract_by_line_text(data, start_pattern, end_pattern, inclusive=True):
         return result
     return []
 
+# Detect column intervals of an extracted region from an x-coverage histogram of all word spans.
+# Gutters are runs of bins covered by at most max_coverage of the lines and at least min_gap pt wide.
+# Returns header entries ({"text", "x0", "x1"}) that extract_by_header_coords can use directly.
+def detect_columns(data, min_gap=8.0, max_coverage=0.02, bin_width=1.0):
+    import numpy as np
+
+    lines = [block.get('words', []) for block in data if block.get('words')]
+    if not lines:
+        return []
+
+    x0 = np.fromiter((w['x0'] for words in lines for w in words), dtype=float)
+    x1 = np.fromiter((w['x1'] for words in lines for w in words), dtype=float)
+    origin = np.floor(x0.min())
+    n_bins = int(np.ceil((x1.max() - origin) / bin_width)) + 1
+
+    # +1 where a word starts, -1 where it ends; the running sum is the number of words over each bin
+    delta = np.zeros(n_bins + 1, dtype=np.int64)
+    np.add.at(delta, np.floor((x0 - origin) / bin_width).astype(np.int64), 1)
+    np.add.at(delta, np.ceil((x1 - origin) / bin_width).astype(np.int64), -1)
+    coverage = np.cumsum(delta)[:n_bins]
+
+    # Edges of the covered runs; short gaps are absorbed into the surrounding column
+    covered = coverage > max_coverage * len(lines)
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], covered, [False])).astype(np.int8)))
+    runs = edges.reshape(-1, 2)
+    intervals = []
+    for start, end in runs.tolist():
+        if intervals and (start - intervals[-1][1]) * bin_width < min_gap:
+            intervals[-1][1] = end
+        else:
+            intervals.append([start, end])
+
+    columns = [
+        {"x0": float(origin + start * bin_width), "x1": float(origin + end * bin_width)}
+        for start, end in intervals
+    ]
+
+    # Name the columns after the first line that has a word in every column (normally the header row)
+    names = [f"Column {i + 1}" for i in range(len(columns))]
+    for words in lines:
+        found = {}
+        for w in words:
+            mid = (w['x0'] + w['x1']) / 2
+            for i, column in enumerate(columns):
+                if column['x0'] <= mid <= column['x1'] and i not in found:
+                    found[i] = w['text'].strip()
+        if len(found) == len(columns) and all(found.values()):
+            names = [found[i] for i in range(len(columns))]
+            break
+
+    seen = defaultdict(int)
+    for i, column in enumerate(columns):
+        name = names[i]
+        seen[name] += 1
+        column["text"] = name if seen[name] == 1 else f"{name} {seen[name]}"
+
+    return [{"text": c["text"], "x0": c["x0"], "x1": c["x1"]} for c in columns]
+
 def find_best_matching_header(headers, x0, x1):
     best_match = None
     best_score = float('inf')
@@ -215,10 +618,164 @@ def process_page_headers(results, header_each_page="yes", header_row=(11, 14)):
     return filtered_results
 
 
-def save_results_to_excel(results, excel_path):
+# Column types accepted in a request model "schema"; text columns are left as-is
+COLUMN_TYPES = ("int", "decimal", "percent", "text")
+
+# A cell counts as numeric when it looks like 1,234 / -0.12 / (0.12) / £5,346 / GBP 6,641,109 /
+# (USD 8,300,000) / 12.36%. Parentheses (a negative amount) must be balanced.
+NUMERIC_BODY_PATTERN = r"-?(?:[£$€]|[A-Z]{3}\s?)?(?:\d[\d,]*(?:\.\d+)?|\.\d+)%?"
+NUMERIC_CELL_PATTERN = rf"{NUMERIC_BODY_PATTERN}|\({NUMERIC_BODY_PATTERN}\)"
+
+# Cells that mean "nothing here" rather than a number, left empty without a warning
+NIL_CELL_PATTERN = r"(?i)[-–—]+|nil|n/?a"
+
+# Resolve schema keys (header text such as "Holding" or labels such as "H2") to row labels
+def resolve_column_schema(header_lines, schema):
+    header_mapping = {header['text']: f'H{i+1}' for i, header in enumerate(header_lines)}
+    labels = set(header_mapping.values())
+    resolved = {}
+    for column, column_type in schema.items():
+        if column_type not in COLUMN_TYPES:
+            raise ValueError(f"Unknown column type '{column_type}' for column '{column}'")
+        if column in header_mapping:
+            resolved[header_mapping[column]] = column_type
+        elif column in labels:
+            resolved[column] = column_type
+        else:
+            raise ValueError(f"Schema column '{column}' does not match any header")
+    return resolved
+
+# Parse one column of raw cell strings into int64 / float64 values in a single vectorized pass.
+# Non-empty cells that are not numbers (other than nil markers) become empty and are logged, with
+# their text, under `column`.
+def parse_numeric_column(values, column_type, column=None):
+    import pandas as pd
+
+    text = pd.Series(values, dtype=object).str.strip()
+    valid = text.str.fullmatch(NUMERIC_CELL_PATTERN).fillna(False).astype(bool)
+    negative = valid & text.str.startswith("(")
+    cleaned = text.where(valid).str.replace(r"[A-Z]{3}\s?|[,()£$€%]", "", regex=True)
+    numbers = pd.to_numeric(cleaned, errors="coerce")
+    numbers = numbers.where(~negative, -numbers)
+    if column_type == "int":
+        # Nullable Int64 keeps int64 storage while allowing empty cells (headings, totals)
+        numbers = numbers.where(numbers % 1 == 0)
+
+    nil = text.str.fullmatch(NIL_CELL_PATTERN).fillna(False).astype(bool)
+    rejected = text[numbers.isna() & text.fillna("").ne("") & ~nil]
+    if len(rejected):
+        shown = ", ".join(repr(value) for value in rejected.unique()[:10])
+        logger.warning(f"⚠️ {column or 'Column'}: {len(rejected)} non-numeric {column_type} cell(s) left empty: {shown}")
+    return numbers.astype("Int64") if column_type == "int" else numbers.astype("float64")
+
+# Convert table rows into a typed, columnar DataFrame according to the request model schema
+def apply_column_schema(results, header_lines, schema):
+    import pandas as pd
+
+    column_types = resolve_column_schema(header_lines, schema)
     df = pd.DataFrame(results)
+    for label, column_type in column_types.items():
+        if column_type == "text" or label not in df.columns:
+            continue
+        df[label] = parse_numeric_column(df[label].to_numpy(), column_type, column=label)
+    return df
+
+# Indices of the blocks matching the request model's start/end regexes, the state a shard needs so
+# the region can be stitched across shard boundaries
+def find_region_matches(data, start_pattern, end_pattern):
+    return {
+        "start_matches": [i for i, block in enumerate(data) if re.search(start_pattern, block.get("line_text", ""))],
+        "end_matches": [i for i, block in enumerate(data) if re.search(end_pattern, block.get("line_text", ""))]
+    }
+
+# Column headers for a region: the request model's hand-measured ones, or detected from the region
+# itself when the model has none (or asks for "auto")
+def resolve_header_lines(extracted, request_model):
+    header_lines = request_model.get("headers")
+    if extracted and (not header_lines or header_lines == "auto"):
+        header_lines = detect_columns(extracted)
+        logger.info(f"Detected columns: {json.dumps(header_lines)}")
+    return header_lines or None
+
+# Table stage for an extracted region: assign words to the request model's columns, merge/skip page
+# header rows and apply the column schema
+def extract_table_rows(extracted, request_model, header_lines=None):
+    if header_lines is None:
+        header_lines = resolve_header_lines(extracted, request_model)
+
+    if not extracted or not header_lines:
+        return None
+
+    results = extract_by_header_coords(header_lines, extracted)
+    final_results = process_page_headers(results, header_each_page="no", header_row=(3, 6))
+    schema = request_model.get("schema")
+    if schema:
+        final_results = apply_column_schema(final_results, header_lines, schema)
+    return final_results
+
+# Table stage that journals every finished page: its region lines and, with the request model's own
+# headers, its rows with the repeated header rows already dropped (the process_page_headers state, the
+# region's start page, goes along). A resumed run replays the journal and carries on after its last page.
+# Returns (region lines, rows) as extract_by_line_text and extract_table_rows would; rows is None when
+# the region is empty or the columns still have to be detected from the whole region.
+def extract_table_with_journal(source, request_model, journal, page_timeout=None, drop_furniture=False,
+                               font_detail="none", pages=None, single_pass=False, crop_to_region=False,
+                               header_row=(3, 6)):
+    start_regex, end_regex = request_model["start_regex"], request_model["end_regex"]
+    header_lines = request_model.get("headers")
+    assign_rows = header_lines not in (None, [], "auto")
+
+    state = {"started": False, "ended": False, "start_page": None}
+    if journal.records:
+        state = {key: journal.records[-1][key] for key in state}
+
+    if not state["ended"]:
+        for page_num, page_blocks in iter_pdf_pages(
+            source, page_timeout, drop_furniture, font_detail=font_detail, pages=pages, single_pass=single_pass,
+            region=(start_regex, end_regex) if crop_to_region else None,
+            resume_after=journal.last_page, region_started=state["started"]
+        ):
+            region, state["started"], state["ended"] = split_region(page_blocks, start_regex, end_regex, state["started"])
+            rows = None
+            if assign_rows and region:
+                rows = extract_by_header_coords(header_lines, region)
+                if state["start_page"] is None:
+                    state["start_page"] = page_num
+                else:
+                    rows = rows[header_row[1]:]
+            journal.commit({"page": page_num, "region": region, "rows": rows, **state})
+            if state["ended"]:
+                break
+        journal.flush()
+
+    if not state["ended"]:
+        return [], None
+    extracted = [block for record in journal.records for block in record["region"]]
+    if not assign_rows:
+        return extracted, None
+
+    results = [row for record in journal.records for row in record["rows"] or []]
+    schema = request_model.get("schema")
+    if schema:
+        results = apply_column_schema(results, header_lines, schema)
+    return extracted, results
+
+# Row label (H1, H2, ...) of the request model's security_column, the first column by default
+def find_security_label(header_lines, request_model):
+    security_column = request_model.get("security_column")
+    return next(
+        (f"H{i+1}" for i, header in enumerate(header_lines) if header["text"] == security_column),
+        "H1"
+    )
+
+# quiet leaves the message to a caller that writes to a temporary path and moves the file into place
+def save_results_to_excel(results, excel_path, quiet=False):
+    import pandas as pd
+
+    df = results if isinstance(results, pd.DataFrame) else pd.DataFrame(results)
     df.to_excel(excel_path, index=False)
-    print(f"Saved successfully to {excel_path} ✅")
+    if not quiet:
+        print(f"Saved successfully to {excel_path} ✅")
 
 def find_valid_header_lines(data):
     for i, block in enumerate(data):
@@ -239,15 +796,214 @@ def find_valid_header_lines(data):
             print(f"Skipping line {i} as word count {word_count} doesn't match header count.")
     return []  # Return empty list if no matching header is found
 
+# Stage 1 of the table pipeline, in its own process: parse pages and stream the region's line blocks
+# one page per queue item. Parsing stops as soon as the end of the region has been seen.
+def pipeline_parse_region(source, start_pattern, end_pattern, page_queue, page_timeout=None, drop_furniture=False,
+                          pages=None, crop_to_region=False):
+    try:
+        started = ended = False
+        crop = (start_pattern, end_pattern) if crop_to_region else None
+        for page_num, page_blocks in iter_pdf_pages(source, page_timeout, drop_furniture, font_detail="none",
+                                                    pages=pages, region=crop):
+            region, started, ended = split_region(page_blocks, start_pattern, end_pattern, started)
+            if region:
+                page_queue.put(("page", page_num, region))
+            if ended:
+                break
+        page_queue.put(("done", ended, None))
+    except Exception:
+        page_queue.put(("error", traceback.format_exc(), None))
+
+# Stage 2, a thread: assign each region page's words to columns as it arrives, skip the repeated
+# header rows of later pages (process_page_headers with header_each_page="no") and type the cells
+def pipeline_assign_rows(page_queue, row_queue, header_lines, schema=None, header_row=(3, 6), parser=None):
+    import queue
+
+    start_page = None
+    failed = False
+    while True:
+        try:
+            kind, value, region = page_queue.get(timeout=1.0)
+        except queue.Empty:
+            if parser is not None and not parser.is_alive():
+                row_queue.put(("error", f"Page parser exited with status {parser.exitcode}"))
+                return
+            continue
+        if kind != "page":
+            row_queue.put((kind, value))
+            return
+        if failed:
+            continue  # keep draining so the parser process never blocks on a full queue
+        try:
+            rows = extract_by_header_coords(header_lines, region)
+            if start_page is None:
+                start_page = value
+            else:
+                rows = rows[header_row[1]:]
+            if schema and rows:
+                rows = apply_column_schema(rows, header_lines, schema)
+            row_queue.put(("rows", rows))
+        except Exception:
+            failed = True
+            row_queue.put(("error", traceback.format_exc()))
+
+# Stage 3, a thread: stream rows into a write-only workbook (same sheet and header row as
+# save_results_to_excel), saved only if the region turned out complete. Reports through result.
+def pipeline_write_excel(row_queue, excel_path, result, started):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    columns = None
+    result.update(rows=0, status=None, error=None)
+    while True:
+        kind, value = row_queue.get()
+        if kind != "rows":
+            result["status"] = kind
+            if kind == "done":
+                result["region_complete"] = value
+            elif kind == "error" and result["error"] is None:
+                result["error"] = value
+            break
+        if result["error"]:
+            continue
+        try:
+            if hasattr(value, "to_dict"):
+                batch_columns = list(value.columns)
+                rows = value.astype(object).where(value.notna(), None).itertuples(index=False, name=None)
+            else:
+                batch_columns = list(value[0]) if value else columns
+                rows = ([row[column] for column in batch_columns] for row in value)
+            for row in rows:
+                if columns is None:
+                    columns = batch_columns
+                    sheet.append(columns)
+                sheet.append(list(row))
+                result["rows"] += 1
+                if result["rows"] == 1:
+                    logger.info(f"First row reached the writer after {time.perf_counter() - started:.2f}s")
+        except Exception:
+            result["error"] = traceback.format_exc()
+
+    result["saved"] = result["status"] == "done" and result.get("region_complete") and result["rows"] > 0 \
+        and result["error"] is None
+    if result["saved"]:
+        try:
+            workbook.save(excel_path)
+        except Exception:
+            result["saved"] = False
+            result["error"] = traceback.format_exc()
+
+# Pipelined backup.py run: parser process -> row assigner thread -> Excel writer thread, joined by
+# bounded queues. The workbook is written next to excel_path and renamed over it only once the region
+# has been seen complete. Returns the number of rows written, or None when there is no complete region.
+def run_table_pipeline(source, excel_path, request_model, page_timeout=None, drop_furniture=False, pages=None,
+                       queue_size=4, crop_to_region=False):
+    import queue
+    import multiprocessing
+    import openpyxl  # fail before any stage starts rather than inside the writer thread
+
+    started = time.perf_counter()
+    page_queue = multiprocessing.Queue(maxsize=queue_size)
+    row_queue = queue.Queue(maxsize=queue_size)
+    parser = multiprocessing.Process(
+        target=pipeline_parse_region,
+        args=(source, request_model["start_regex"], request_model["end_regex"], page_queue, page_timeout,
+              drop_furniture, pages, crop_to_region),
+        daemon=True
+    )
+    parser.start()
+
+    directory, name = os.path.split(excel_path)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    result = {}
+    assigner = threading.Thread(
+        target=pipeline_assign_rows,
+        args=(page_queue, row_queue, request_model["headers"], request_model.get("schema")),
+        kwargs={"parser": parser}
+    )
+    writer = threading.Thread(target=pipeline_write_excel, args=(row_queue, tmp_path, result, started))
+    assigner.start()
+    writer.start()
+    writer.join()
+    assigner.join()
+    parser.join()
+
+    if result["error"]:
+        raise RuntimeError(f"Table pipeline failed:\n{result['error']}")
+    if not result["saved"]:
+        return None
+    os.replace(tmp_path, excel_path)
+    logger.info(f"Pipeline finished in {time.perf_counter() - started:.2f}s")
+    print(f"Saved successfully to {excel_path} ✅")
+    return result["rows"]
+
 def main():
-    if len(sys.argv) != 5:
-        print("\nUsage:\npython script.py <pdf_input_path> <excel_output_path> <request_model> <request_model_json>\n")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Extract a table from a PDF into Excel using a request model")
+    parser.add_argument("pdf_input_path")
+    parser.add_argument("excel_output_path")
+    parser.add_argument("request_model", help="name of the request model to use")
+    parser.add_argument("request_model_json", help="JSON file containing the request models")
+    parser.add_argument("--page-timeout", type=float, default=None,
+                        help="seconds allowed per page before it is re-extracted with PyMuPDF")
+    parser.add_argument("--drop-furniture", action="store_true",
+                        help="drop running page headers/footers before row assignment")
+    parser.add_argument("--font-detail", choices=FONT_DETAIL_LEVELS, default="none",
+                        help="font annotation level; the table stage does not use fonts")
+    parser.add_argument("--single-pass", action="store_true",
+                        help="take fonts from the word segmentation instead of searching page chars")
+    parser.add_argument("--pages", type=parse_page_range, default=None,
+                        help="only extract pages A-B (1-based, inclusive; 'A-' runs to the end); needs --shard-output")
+    parser.add_argument("--shard-output", default=None,
+                        help="write a mergeable shard for --pages instead of Excel (see 'shards.py merge')")
+    parser.add_argument("--sqlite", default=None,
+                        help="also upsert the rows into this SQLite holdings store (see holdings_store.py)")
+    parser.add_argument("--report-date", default=None,
+                        help="report date for --sqlite, overriding the request model's report_date_regex")
+    parser.add_argument("--reference-csv", default=None,
+                        help="match security names against this security master CSV (see security_matcher.py)")
+    parser.add_argument("--reference-name-column", default="name")
+    parser.add_argument("--reference-id-column", default=None)
+    parser.add_argument("--match-top-k", type=int, default=3)
+    parser.add_argument("--match-min-score", type=float, default=0.5)
+    parser.add_argument("--crop-to-region", action="store_true",
+                        help="only extract the table between the request model's anchors and stop parsing after it")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap parsing, row assignment and Excel writing, and stop parsing after the region")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="journal every finished page so an interrupted run can be resumed")
+    parser.add_argument("--journal", default=None, help="journal file (default: <excel_output_path>.journal)")
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="pages per journal write")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue after the journal's last page (implies --checkpoint)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log per-page timings")
+    args = parser.parse_args()
+
+    # The header rows to drop depend on the region's real first page, and the start regex can match on every
+    # page of the region, so a page range is only ever written as a shard and rows come from the merged region
+    if args.match_top_k < 1:
+        parser.error("--match-top-k must be at least 1")
+    if args.pages and not args.shard_output:
+        parser.error("--pages writes a shard; give --shard-output and merge the shards with 'shards.py merge'")
+    if args.pipeline and (args.shard_output or args.sqlite or args.reference_csv):
+        parser.error("--pipeline only writes Excel; it cannot be combined with --shard-output, --sqlite or --reference-csv")
+    if args.crop_to_region and args.shard_output:
+        parser.error("--crop-to-region needs the region's start page; it cannot be combined with --shard-output")
+    if args.drop_furniture and args.shard_output:
+        # Furniture is what repeats across the document's pages; a shard only sees its own range
+        # (a single page never repeats), so the merged rows could differ from a single run
+        parser.error("--drop-furniture needs every page of the document; it cannot be combined with --shard-output")
+    args.checkpoint = args.checkpoint or args.resume
+    if args.checkpoint and (args.pipeline or args.shard_output):
+        parser.error("--checkpoint/--resume cannot be combined with --pipeline or --shard-output")
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
 
-    pdf_input_path = sys.argv[1]
-    excel_output_path = sys.argv[2]
-    request_model_name = sys.argv[3]  # This is the request model name
-    request_model_path = sys.argv[4]
+    pdf_input_path = args.pdf_input_path
+    excel_output_path = args.excel_output_path
+    request_model_name = args.request_model  # This is the request model name
+    request_model_path = args.request_model_json
+    journal = None
 
     try:
         # Load the request model JSON
@@ -260,24 +1016,112 @@ def main():
             print(f"Error: Request model '{request_model_name}' not found.")
             sys.exit(1)
 
-        # Extract headers and regex patterns from the request model
+        # Extract regex patterns from the request model
         start_regex = request_model["start_regex"]
         end_regex = request_model["end_regex"]
-        header_lines = request_model["headers"]
 
-        full_data = extract_pdf_to_json(pdf_input_path)
-        extracted = extract_by_line_text(full_data, start_regex, end_regex)
+        if args.pipeline:
+            if request_model.get("headers") in (None, [], "auto"):
+                logger.warning("Column detection needs the whole region, running the stages one after another")
+            else:
+                rows = run_table_pipeline(
+                    pdf_input_path, excel_output_path, request_model,
+                    page_timeout=args.page_timeout,
+                    drop_furniture=args.drop_furniture,
+                    pages=args.pages,
+                    crop_to_region=args.crop_to_region
+                )
+                if rows is None:
+                    print("⚠️ No table region or header lines found. Nothing to extract.")
+                return
+
+        if args.checkpoint:
+            from checkpoint import PageJournal
+            from holdings_store import source_sha256
+
+            # Everything that shapes the output; a journal for anything else is refused on resume
+            run = {
+                "source_sha256": source_sha256(pdf_input_path),
+                "request_model": request_model,
+                "pages": args.pages,
+                "page_timeout": args.page_timeout,
+                "drop_furniture": args.drop_furniture,
+                "font_detail": args.font_detail,
+                "single_pass": args.single_pass,
+                "crop_to_region": args.crop_to_region
+            }
+            journal = PageJournal(args.journal or f"{excel_output_path}.journal", run, resume=args.resume,
+                                  every=args.checkpoint_every)
+            extracted, final_results = extract_table_with_journal(
+                pdf_input_path, request_model, journal,
+                page_timeout=args.page_timeout,
+                drop_furniture=args.drop_furniture,
+                font_detail=args.font_detail,
+                pages=args.pages,
+                single_pass=args.single_pass,
+                crop_to_region=args.crop_to_region
+            )
+            header_lines = resolve_header_lines(extracted, request_model)
+            if final_results is None:
+                final_results = extract_table_rows(extracted, request_model, header_lines)
+        else:
+            full_data = extract_pdf_to_json(
+                pdf_input_path,
+                page_timeout=args.page_timeout,
+                drop_furniture=args.drop_furniture,
+                font_detail=args.font_detail,
+                pages=args.pages,
+                single_pass=args.single_pass,
+                region=(start_regex, end_regex) if args.crop_to_region else None
+            )
+
+            if args.shard_output:
+                page_count = count_pages(pdf_input_path)
+                shard = shard_document(
+                    "table",
+                    resolve_page_range(args.pages, page_count),
+                    page_count,
+                    full_data,
+                    header_state=find_region_matches(full_data, start_regex, end_regex),
+                    request_model=request_model
+                )
+                save_shard(shard, args.shard_output)
+                return
+
+            extracted = extract_by_line_text(full_data, start_regex, end_regex)
+            header_lines = resolve_header_lines(extracted, request_model)
+            final_results = extract_table_rows(extracted, request_model, header_lines)
 
-        if header_lines:
-            results = extract_by_header_coords(header_lines, extracted)
-            final_results = process_page_headers(results, header_each_page="no", header_row=(3, 6))
+        if final_results is not None and args.reference_csv:
+            from security_matcher import SecurityMatcher, add_security_matches
+
+            matcher = SecurityMatcher.from_csv(args.reference_csv, args.reference_name_column, args.reference_id_column)
+            final_results = add_security_matches(
+                final_results, find_security_label(header_lines, request_model), matcher,
+                top_k=args.match_top_k, min_score=args.match_min_score
+            )
+
+        if final_results is not None:
             save_results_to_excel(final_results, excel_output_path)
+            if args.sqlite:
+                from holdings_store import save_results_to_sqlite, parse_report_date, find_report_date
+
+                report_date = args.report_date and parse_report_date(args.report_date)
+                if not report_date and request_model.get("report_date_regex"):
+                    report_date = find_report_date(extracted, request_model["report_date_regex"])
+                save_results_to_sqlite(final_results, header_lines, args.sqlite, pdf_input_path, request_model,
+                                       report_date=report_date)
         else:
-            print("⚠️ No header lines found or provided. Nothing to extract.")
+            print("⚠️ No table region or header lines found. Nothing to extract.")
+        if journal is not None:
+            journal.remove()
 
     except Exception as e:
         print(f"Error: {str(e)}")
         traceback.print_exc()
+    finally:
+        if journal is not None:
+            journal.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,274 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+# Predicted extraction seconds: per page, per decoded content-stream byte, per text-layer char, and per
+# chunk (opening the PDF). Fitted on the FTSE report with font_detail="line"; refit with --fit-model.
+DEFAULT_COST_MODEL = {"page": 0.002, "stream_byte": 1.1e-6, "char": 5.6e-5, "chunk": 0.05}
+COST_FEATURES = ("page", "stream_byte", "char", "chunk")
+
+# Without PyMuPDF the file size is spread evenly over the pages, at this many chars per stream byte
+CHARS_PER_STREAM_BYTE = 0.2
+
+# Chunks per worker the batch is cut into: more gives a flatter finish, fewer saves PDF re-opens
+DEFAULT_CHUNKS_PER_WORKER = 3
+
+# Cheap per-page features of one PDF: content-stream size and char count from the fitz text layer, or a
+# file-size estimate when PyMuPDF is missing (the page count then comes from pdfplumber)
+def prescan_pdf(pdf_path):
+    start = time.perf_counter()
+    try:
+        from pdf_source import open_fitz_document
+
+        with open_fitz_document(pdf_path) as doc:
+            pages = [
+                {
+                    "stream_bytes": sum(len(doc.xref_stream(xref) or b"") for xref in page.get_contents()),
+                    "chars": len(page.get_text("text"))
+                }
+                for page in doc
+            ]
+        method = "pymupdf"
+    except ImportError:
+        from shards import count_pages
+
+        page_count = count_pages(pdf_path)
+        stream_bytes = os.path.getsize(pdf_path) / max(page_count, 1)
+        pages = [{"stream_bytes": stream_bytes, "chars": stream_bytes * CHARS_PER_STREAM_BYTE}] * page_count
+        method = "file size"
+    return {"path": pdf_path, "pages": pages, "method": method, "prescan_seconds": time.perf_counter() - start}
+
+# Feature sums of a page range (1-based, inclusive) extracted as one chunk
+def chunk_features(document, first, last):
+    pages = document["pages"][first - 1:last]
+    return {
+        "page": len(pages),
+        "stream_byte": sum(page["stream_bytes"] for page in pages),
+        "char": sum(page["chars"] for page in pages),
+        "chunk": 1
+    }
+
+def predict_cost(features, model):
+    return sum(model.get(name, 0.0) * features[name] for name in COST_FEATURES)
+
+# Cut every document into runs of consecutive pages costing about total / (processes * chunks_per_worker),
+# so no single chunk holds up the end of the batch; documents cheaper than that stay whole
+def plan_chunks(documents, model, processes, chunks_per_worker=DEFAULT_CHUNKS_PER_WORKER):
+    total = sum(
+        predict_cost(chunk_features(document, 1, len(document["pages"])), model) for document in documents
+    )
+    target = total / max(processes * chunks_per_worker, 1)
+
+    chunks = []
+    for doc_id, document in enumerate(documents):
+        page_count = len(document["pages"])
+        page_costs = [
+            predict_cost(chunk_features(document, page_num, page_num), model) - model.get("chunk", 0.0)
+            for page_num in range(1, page_count + 1)
+        ]
+        first = 1
+        while first <= page_count:
+            last = first
+            cost = model.get("chunk", 0.0) + page_costs[first - 1]
+            while last < page_count and cost + page_costs[last] <= target:
+                cost += page_costs[last]
+                last += 1
+            features = chunk_features(document, first, last)
+            chunks.append({"doc": doc_id, "first": first, "last": last, "features": features,
+                           "predicted": predict_cost(features, model)})
+            first = last + 1
+    return chunks
+
+# Shards are prefixed with the document's index in the batch, so PDFs sharing a file name never share shards
+def shard_path(shard_dir, doc_id, pdf_path, first, last):
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(shard_dir, f"{doc_id}.{stem}.{first}-{last}.json")
+
+# Worker task: extract one page range and write it straight to disk, the final JSON for a whole
+# document or a lines shard otherwise. Returns (lines, seconds spent).
+def extract_chunk(pdf_path, first, last, page_count, output_path, font_detail="line", page_timeout=None,
+                  single_pass=False):
+    import pdfplumber  # a fresh worker's import time is not part of its first chunk's cost
+    from backup import extract_pdf_to_json
+    from shards import shard_document
+    from atomic_io import write_json_atomic
+
+    start = time.perf_counter()
+    data = extract_pdf_to_json(pdf_path, page_timeout=page_timeout, font_detail=font_detail,
+                               pages=(first, last), single_pass=single_pass)
+    if first == 1 and last == page_count:
+        write_json_atomic(output_path, data)
+    else:
+        write_json_atomic(output_path, shard_document("lines", (first, last), page_count, data))
+    return len(data), time.perf_counter() - start
+
+# Chunks needed per cost feature before each coefficient is fitted on its own
+MIN_CHUNKS_PER_FEATURE = 3
+
+# Cost model refitted to measured chunks: least squares per feature (coefficients kept non-negative) given
+# enough chunks, otherwise the current model scaled by total actual / total predicted. None if nothing ran.
+def fit_cost_model(chunks, model):
+    import numpy as np
+
+    measured = [chunk for chunk in chunks if chunk.get("actual") is not None]
+    predicted = sum(chunk["predicted"] for chunk in measured)
+    if not measured or not predicted:
+        return None
+    if len(measured) < MIN_CHUNKS_PER_FEATURE * len(COST_FEATURES):
+        factor = sum(chunk["actual"] for chunk in measured) / predicted
+        return {name: model.get(name, 0.0) * factor for name in COST_FEATURES}
+
+    x = np.array([[chunk["features"][name] for name in COST_FEATURES] for chunk in measured], dtype=float)
+    y = np.array([chunk["actual"] for chunk in measured])
+    # Scale the columns first, stream bytes and chunk counts differ by orders of magnitude
+    scale = np.where(x.max(axis=0) > 0, x.max(axis=0), 1.0)
+    coefficients, *_ = np.linalg.lstsq(x / scale, y, rcond=None)
+    return {name: max(float(value), 0.0) for name, value in zip(COST_FEATURES, coefficients / scale)}
+
+# Pre-scan, chunk, and run the chunks on a SupervisedPool largest-first (longest-processing-time order),
+# merging a document's shards as soon as its last chunk is in. Returns (documents, chunks, makespan).
+def run_batch(pdf_paths, output_dir, model=None, processes=2, chunks_per_worker=DEFAULT_CHUNKS_PER_WORKER,
+              font_detail="line", page_timeout=None, single_pass=False, max_tasks_per_worker=None,
+              rss_limit_mb=None):
+    from concurrent.futures import as_completed
+    from shards import load_shards, merge_text_lines
+    from atomic_io import write_json_atomic
+    from worker_pool import SupervisedPool, output_json_paths
+
+    model = model or DEFAULT_COST_MODEL
+    documents = []
+    for pdf_path, output_path in zip(pdf_paths, output_json_paths(output_dir, pdf_paths)):
+        try:
+            document = dict(prescan_pdf(pdf_path), error=None)
+        except Exception as e:
+            # Nothing is scheduled for it; the rest of the batch still runs
+            document = {"path": pdf_path, "pages": [], "method": None, "prescan_seconds": 0.0,
+                        "error": f"pre-scan failed: {type(e).__name__}: {e}"}
+            print(f"❌ {pdf_path}: {document['error']}")
+        document["output_path"] = output_path
+        document["remaining"] = 0
+        document["lines"] = 0
+        documents.append(document)
+
+    chunks = plan_chunks(documents, model, processes, chunks_per_worker)
+    shard_dir = os.path.join(output_dir, ".shards")
+    os.makedirs(shard_dir, exist_ok=True)
+    for chunk in chunks:
+        document = documents[chunk["doc"]]
+        document["remaining"] += 1
+        page_count = len(document["pages"])
+        whole = chunk["first"] == 1 and chunk["last"] == page_count
+        chunk["path"] = document["output_path"] if whole else \
+            shard_path(shard_dir, chunk["doc"], document["path"], chunk["first"], chunk["last"])
+        chunk["actual"] = None
+
+    start = time.perf_counter()
+    with SupervisedPool(processes, max_tasks_per_worker, rss_limit_mb) as pool:
+        futures = {}
+        for chunk in sorted(chunks, key=lambda chunk: chunk["predicted"], reverse=True):
+            document = documents[chunk["doc"]]
+            label = f"{os.path.basename(document['path'])} p{chunk['first']}-{chunk['last']}"
+            future = pool.submit(
+                extract_chunk, document["path"], chunk["first"], chunk["last"], len(document["pages"]), chunk["path"],
+                label=label, font_detail=font_detail, page_timeout=page_timeout, single_pass=single_pass
+            )
+            futures[future] = chunk
+
+        for future in as_completed(futures):
+            chunk = futures[future]
+            document = documents[chunk["doc"]]
+            document["remaining"] -= 1
+            try:
+                lines, chunk["actual"] = future.result()
+                document["lines"] += lines
+            except Exception as e:
+                document["error"] = document["error"] or f"pages {chunk['first']}-{chunk['last']}: {type(e).__name__}: {e}"
+
+            if document["remaining"] == 0 and document["error"] is None:
+                paths = [other["path"] for other in chunks if other["doc"] == chunk["doc"]]
+                if paths != [document["output_path"]]:
+                    write_json_atomic(document["output_path"], merge_text_lines(load_shards(paths)))
+                    for path in paths:
+                        os.remove(path)
+            if document["remaining"] == 0:
+                document["finished"] = time.perf_counter() - start
+                mark = "✅" if document["error"] is None else "❌"
+                print(f"{mark} {document['path']}: {document['error'] or str(document['lines']) + ' lines'}")
+
+    makespan = time.perf_counter() - start
+    if not os.listdir(shard_dir):
+        os.rmdir(shard_dir)
+    return documents, chunks, makespan
+
+# Predicted vs actual seconds per document (actual = summed chunk time in the workers)
+def print_cost_report(documents, chunks, makespan, processes):
+    print(f"{'document':<40} {'pages':>6} {'chunks':>6} {'predicted':>10} {'actual':>8} {'ratio':>6}")
+    for doc_id, document in enumerate(documents):
+        doc_chunks = [chunk for chunk in chunks if chunk["doc"] == doc_id]
+        predicted = sum(chunk["predicted"] for chunk in doc_chunks)
+        measured = [chunk["actual"] for chunk in doc_chunks if chunk["actual"] is not None]
+        actual = sum(measured) if doc_chunks and len(measured) == len(doc_chunks) else None
+        ratio = f"{actual / predicted:.2f}" if actual and predicted else "-"
+        print(f"{os.path.basename(document['path'])[:40]:<40} {len(document['pages']):>6} {len(doc_chunks):>6} "
+              f"{predicted:>9.2f}s {(f'{actual:.2f}s' if actual is not None else '-'):>8} {ratio:>6}")
+
+    work = sum(chunk["actual"] or 0.0 for chunk in chunks)
+    prescan = sum(document["prescan_seconds"] for document in documents)
+    print(f"Makespan {makespan:.2f}s for {work:.2f}s of work on {processes} workers "
+          f"(ideal {work / processes:.2f}s), pre-scan {prescan:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract a batch of PDFs to JSON, biggest work first, "
+                                                 "with large documents split into page chunks")
+    parser.add_argument("output_dir")
+    parser.add_argument("pdf_paths", nargs="+")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--chunks-per-worker", type=int, default=DEFAULT_CHUNKS_PER_WORKER)
+    parser.add_argument("--cost-model", default=None, help="cost model JSON (see --fit-model)")
+    parser.add_argument("--fit-model", default=None, help="fit a cost model to this batch's timings and save it here")
+    parser.add_argument("--report", default=None, help="write per-chunk predicted and actual seconds to this JSON")
+    parser.add_argument("--font-detail", choices=("none", "line", "word", "span"), default="line")
+    parser.add_argument("--page-timeout", type=float, default=None)
+    parser.add_argument("--single-pass", action="store_true", help="take fonts from the word segmentation")
+    parser.add_argument("--max-tasks-per-worker", type=int, default=None)
+    parser.add_argument("--rss-limit-mb", type=float, default=None)
+    args = parser.parse_args()
+
+    model = None
+    if args.cost_model:
+        with open(args.cost_model, "r", encoding="utf-8") as f:
+            model = json.load(f)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    documents, chunks, makespan = run_batch(
+        args.pdf_paths, args.output_dir, model=model, processes=args.processes,
+        chunks_per_worker=args.chunks_per_worker, font_detail=args.font_detail, page_timeout=args.page_timeout,
+        single_pass=args.single_pass, max_tasks_per_worker=args.max_tasks_per_worker, rss_limit_mb=args.rss_limit_mb
+    )
+    print_cost_report(documents, chunks, makespan, args.processes)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump([
+                {"path": documents[chunk["doc"]]["path"], "pages": [chunk["first"], chunk["last"]],
+                 "features": chunk["features"], "predicted": chunk["predicted"], "actual": chunk["actual"]}
+                for chunk in chunks
+            ], f, indent=2)
+        print(f"Report saved to {args.report}")
+
+    if args.fit_model:
+        fitted = fit_cost_model(chunks, model or DEFAULT_COST_MODEL)
+        if fitted is None:
+            print("⚠️ No measured chunks to fit a cost model to")
+        else:
+            with open(args.fit_model, "w", encoding="utf-8") as f:
+                json.dump(fitted, f, indent=2)
+            print(f"Cost model saved to {args.fit_model}: {json.dumps(fitted)}")
+
+    if any(document["error"] for document in documents):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import sys
+import re
+import time
+import argparse
+import subprocess
+from statistics import median
+
+# Entry points that have to start quickly for short jobs (checked with --help)
+ENTRY_POINTS = [
+    "backup.py",
+    "pdf_table_extractor_backup.py",
+    "pdf_to_json.py",
+    "pdf_to_json_with_extra_100.py",
+    "cross-check.py",
+    "fitz.py",
+    "json_to_text.py",
+    "shards.py",
+    "holdings_store.py",
+    "corpus_index.py",
+    "watch_folder.py",
+    "worker_pool.py",
+    "holdings_delta.py",
+    "security_matcher.py",
+    "parity_check.py",
+    "batch_scheduler.py"
+]
+
+# Modules that must only be imported on the code path that needs them
+HEAVY_MODULES = ("pandas", "numpy", "pdfplumber", "pdfminer", "pymupdf", "openpyxl")
+
+# "import time:  self [us] | cumulative | imported package" lines written by -X importtime
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( +)(\S+)")
+
+# Run a script once under -X importtime and collect wall time plus per-module import times
+def measure_import_time(script, script_args=("--help",)):
+    cmd = [sys.executable, "-X", "importtime", script, *script_args]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            modules.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": (len(match.group(3)) - 1) // 2
+            })
+
+    return {
+        "script": script,
+        "returncode": proc.returncode,
+        "wall_ms": wall_ms,
+        "import_ms": sum(m["self_us"] for m in modules) / 1000,
+        "modules": modules
+    }
+
+# Check every entry point against the start-up budget, return True when all pass
+def check_import_budget(scripts, budget_ms=100.0, runs=5, top=5):
+    all_ok = True
+    for script in scripts:
+        measurements = [measure_import_time(script) for _ in range(runs)]
+        last = measurements[-1]
+        wall_ms = median(m["wall_ms"] for m in measurements)
+        import_ms = median(m["import_ms"] for m in measurements)
+        heavy = sorted({
+            m["module"].split(".")[0] for m in last["modules"]
+            if m["module"].split(".")[0] in HEAVY_MODULES
+        })
+
+        ok = last["returncode"] == 0 and wall_ms <= budget_ms and not heavy
+        all_ok = all_ok and ok
+        print(f"{'✅' if ok else '❌'} {script}: wall {wall_ms:.1f} ms, imports {import_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+
+        if last["returncode"] != 0:
+            print(f"   exited with status {last['returncode']}")
+        if heavy:
+            print(f"   heavy modules imported at start-up: {', '.join(heavy)}")
+
+        slowest = sorted(
+            (m for m in last["modules"] if m["depth"] == 0),
+            key=lambda m: m["cumulative_us"],
+            reverse=True
+        )[:top]
+        for m in slowest:
+            print(f"   {m['cumulative_us'] / 1000:8.2f} ms  {m['module']}")
+
+    return all_ok
+
+# Every font_detail level, with fonts found by char search and, for the levels that use fonts, read off
+# the word segmentation
+def font_detail_configs():
+    from backup import FONT_DETAIL_LEVELS
+
+    return [(level, single_pass) for level in FONT_DETAIL_LEVELS
+            for single_pass in ((False, True) if level != "none" else (False,))]
+
+# Run each configuration `runs` times, taking turns within each round so machine drift hits them alike,
+# and print the median and min-max spread of each relative to the first configuration
+def time_configs(configs, run, runs):
+    seconds = {config: [] for config in configs}
+    for _ in range(runs):
+        for config in configs:
+            start = time.perf_counter()
+            run(*config)
+            seconds[config].append(time.perf_counter() - start)
+
+    timings = {}
+    baseline = median(seconds[configs[0]])
+    for level, single_pass in configs:
+        name = f"{level}, single pass" if single_pass else level
+        runs_s = seconds[(level, single_pass)]
+        timings[name] = median(runs_s)
+        print(f"{name:>17}: {timings[name]:.3f} s [{min(runs_s):.3f}-{max(runs_s):.3f}] "
+              f"({timings[name] / baseline:.2f}x none)")
+    return timings
+
+# Time every font_detail level on one PDF, median [min-max] of `runs`. End to end, pdfminer's layout parse
+# dominates and its run-to-run noise is larger than the font work, so the levels are also timed on pages
+# parsed beforehand: word segmentation plus font work only, which is what the levels change.
+def benchmark_font_detail(pdf_path, runs=7):
+    import pdfplumber
+    from backup import extract_pdf_to_json, extract_page_blocks
+
+    configs = font_detail_configs()
+    # The first run pays one-off import and font-cache costs, keep it out of the numbers
+    lines = len(extract_pdf_to_json(pdf_path, font_detail="none"))
+
+    print(f"End to end ({lines} lines), {runs} runs, median [min-max]")
+    end_to_end = time_configs(
+        configs, lambda level, single_pass: extract_pdf_to_json(pdf_path, font_detail=level, single_pass=single_pass),
+        runs
+    )
+
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            page.chars  # parse the layout once; pdfplumber keeps it on the page
+
+        def extract_parsed(level, single_pass):
+            for page_num, page in enumerate(pdf.pages, start=1):
+                extract_page_blocks(page, page_num, font_detail=level, single_pass=single_pass)
+
+        print(f"Segmentation and fonts on parsed pages, {runs} runs, median [min-max]")
+        parsed = time_configs(configs, extract_parsed, runs)
+    return {"end_to_end": end_to_end, "parsed": parsed}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the FTSE extraction scripts")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("imports", help="check start-up time of the entry points via -X importtime")
+    imports.add_argument("scripts", nargs="*", default=ENTRY_POINTS)
+    imports.add_argument("--budget-ms", type=float, default=100.0)
+    imports.add_argument("--runs", type=int, default=5)
+
+    fonts = commands.add_parser("fonts", help="time extract_pdf_to_json at every font_detail level")
+    fonts.add_argument("pdf_path", nargs="?", default="./FTSE All-Share Index Fund.pdf")
+    fonts.add_argument("--runs", type=int, default=7)
+
+    args = parser.parse_args()
+
+    if args.command == "imports":
+        if not check_import_budget(args.scripts, budget_ms=args.budget_ms, runs=args.runs):
+            sys.exit(1)
+    elif args.command == "fonts":
+        benchmark_font_detail(args.pdf_path, runs=args.runs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import json
+
+# Append-only journal of finished pages for long extraction runs, one JSON object per line. The first
+# line describes the run (source hash and the options that shape the output) so a resume can refuse a
+# journal written for different input. Records are fsync'ed every `every` pages; a torn last line from a
+# crash mid-write is dropped on resume.
+class PageJournal:
+    def __init__(self, path, run, resume=False, every=1):
+        self.path = path
+        self.run = json.loads(json.dumps(run))  # as it reads back: tuples become lists
+        self.every = max(1, every)
+        self.records = []
+        self.pending = []
+
+        if resume and os.path.exists(path):
+            self.load()
+            self.file = open(path, "a", encoding="utf-8")
+        else:
+            if resume:
+                print(f"⚠️ No journal at {path}, starting from the first page")
+            self.file = open(path, "w", encoding="utf-8")
+            self.write_lines([{"journal": 1, "run": run}])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def last_page(self):
+        return self.records[-1]["page"] if self.records else None
+
+    # Read the committed records back and cut the file after the last complete one
+    def load(self):
+        good_size = 0
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                if number == 0:
+                    if entry.get("run") != self.run:
+                        raise ValueError(f"Journal {self.path} was written for a different input or options; "
+                                         f"remove it or run without --resume")
+                else:
+                    self.records.append(entry)
+                good_size += len(line)
+
+        if good_size == 0:
+            raise ValueError(f"Journal {self.path} has no valid header; remove it or run without --resume")
+        with open(self.path, "r+b") as f:
+            f.truncate(good_size)
+        if self.records:
+            print(f"🔁 Resuming after page {self.last_page} ({len(self.records)} pages from {self.path})")
+
+    def write_lines(self, entries):
+        for entry in entries:
+            self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    # Record one finished page (a dict with at least "page"); written out every `every` pages
+    def commit(self, record):
+        self.records.append(record)
+        self.pending.append(record)
+        if len(self.pending) >= self.every:
+            self.flush()
+
+    def flush(self):
+        if self.pending and not self.file.closed:
+            self.write_lines(self.pending)
+            self.pending = []
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    # Drop the journal once the run's output is safely written
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
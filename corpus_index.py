@@ -0,0 +1,211 @@
+import os
+import re
+import sys
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Documents plus one FTS5 row per line block. The trigram tokenizer indexes every 3-character
+# substring, so any literal of 3+ characters in a regex can be looked up in the index.
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id INTEGER PRIMARY KEY,
+    source_sha256 TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    page_count INTEGER NOT NULL,
+    line_count INTEGER NOT NULL,
+    indexed_at TEXT NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(
+    line_text,
+    doc_id UNINDEXED,
+    page UNINDEXED,
+    line UNINDEXED,
+    position UNINDEXED,
+    tokenize = 'trigram'
+);
+"""
+
+# Shortest literal the trigram index can look up
+MIN_LITERAL_LENGTH = 3
+
+REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) + (
+    (sre_parse.POSSESSIVE_REPEAT,) if hasattr(sre_parse, "POSSESSIVE_REPEAT") else ()
+)
+
+# Open (and create if needed) a corpus index
+def open_index(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(INDEX_SCHEMA)
+    return conn
+
+# Line blocks of a document: extracted from a PDF, or read from a cached JSON / JSON Lines extraction
+def iter_document_blocks(path):
+    if path.lower().endswith(".pdf"):
+        from backup import extract_pdf_to_json
+
+        return extract_pdf_to_json(path, font_detail="none")
+
+    from json_to_text import iter_line_blocks
+
+    return iter_line_blocks(path)
+
+# Add one document to the index. Documents are identified by content hash, so a report that is
+# already indexed (under any file name) is skipped unless force is set.
+def index_document(conn, path, force=False):
+    from holdings_store import source_sha256
+
+    source_hash = source_sha256(path)
+    existing = conn.execute("SELECT doc_id FROM documents WHERE source_sha256 = ?", (source_hash,)).fetchone()
+    if existing and not force:
+        return None
+
+    records = []
+    pages = set()
+    page_lines = {}
+    for position, block in enumerate(iter_document_blocks(path)):
+        page = block.get("page")
+        page_lines[page] = page_lines.get(page, 0) + 1
+        pages.add(page)
+        records.append((block.get("line_text", ""), page, page_lines[page], position))
+
+    with conn:
+        if existing:
+            conn.execute("DELETE FROM lines WHERE doc_id = ?", existing)
+            conn.execute("DELETE FROM documents WHERE doc_id = ?", existing)
+        doc_id = conn.execute(
+            "INSERT INTO documents (source_sha256, name, path, page_count, line_count, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (source_hash, os.path.basename(path), os.path.abspath(path), len(pages), len(records),
+             datetime.now(timezone.utc).isoformat())
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO lines (line_text, doc_id, page, line, position) VALUES (?, ?, ?, ?, ?)",
+            [(text, doc_id, page, line, position) for text, page, line, position in records]
+        )
+
+    return doc_id, len(records)
+
+# Quote a literal as an FTS5 string (a substring match under the trigram tokenizer)
+def fts_literal(text):
+    return '"' + text.replace('"', '""') + '"'
+
+# FTS5 terms that every match of a parsed regex must contain: runs of literal characters in the
+# required parts of the pattern. Alternations become OR groups when every branch has a term.
+def required_terms(items):
+    terms, run = [], []
+
+    def flush():
+        if len(run) >= MIN_LITERAL_LENGTH:
+            terms.append(fts_literal("".join(run)))
+        run.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        flush()
+        if op is sre_parse.SUBPATTERN:
+            terms.extend(required_terms(av[-1]))
+        elif op is sre_parse.BRANCH:
+            branches = [required_terms(branch) for branch in av[1]]
+            if all(branches):
+                terms.append("(" + " OR ".join("(" + " AND ".join(branch) + ")" for branch in branches) + ")")
+        elif op in REPEATS and av[0] >= 1:
+            terms.extend(required_terms(av[2]))
+    flush()
+    return terms
+
+# FTS5 query narrowing the lines a regex can match, or None when it has no usable literal
+def regex_match_query(pattern, flags=0):
+    terms = required_terms(sre_parse.parse(pattern, flags))
+    return " AND ".join(terms) if terms else None
+
+# Candidate lines for a regex: index hits when the pattern has literals, every line otherwise
+def candidate_lines(conn, pattern, flags=0, doc_ids=None):
+    query = regex_match_query(pattern, flags)
+    sql = "SELECT doc_id, page, line, position, line_text FROM lines"
+    where, params = [], []
+    if query:
+        where.append("lines MATCH ?")
+        params.append(query)
+    if doc_ids:
+        where.append(f"doc_id IN ({', '.join('?' * len(doc_ids))})")
+        params.extend(doc_ids)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return conn.execute(sql, params)
+
+# Documents and pages that may contain a match, before any regex is run: {doc_id: [pages]}
+def candidate_pages(conn, pattern, flags=0):
+    pages = {}
+    for doc_id, page, _, _, _ in candidate_lines(conn, pattern, flags):
+        pages.setdefault(doc_id, set()).add(page)
+    return {doc_id: sorted(doc_pages) for doc_id, doc_pages in pages.items()}
+
+# Lines matching a regex (re.search on line_text, as extract_by_line_text does) across the corpus,
+# as (document name, page, line within page, position in document, line_text)
+def search_corpus(conn, pattern, flags=0, doc_ids=None):
+    regex = re.compile(pattern, flags)
+    names = dict(conn.execute("SELECT doc_id, name FROM documents"))
+    matches = [
+        (names[doc_id], page, line, position, line_text)
+        for doc_id, page, line, position, line_text in candidate_lines(conn, pattern, flags, doc_ids)
+        if regex.search(line_text)
+    ]
+    matches.sort(key=lambda match: (match[0], match[3]))
+    return matches
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text index over extracted line_text across many fund reports")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="index PDFs or cached JSON/JSONL extractions")
+    add.add_argument("db_path")
+    add.add_argument("paths", nargs="+")
+    add.add_argument("--force", action="store_true", help="re-index documents that are already in the index")
+
+    search = commands.add_parser("search", help="find lines matching a regex")
+    search.add_argument("db_path")
+    search.add_argument("pattern")
+    search.add_argument("-i", "--ignore-case", action="store_true")
+    search.add_argument("--pages-only", action="store_true", help="only list candidate documents and pages")
+
+    args = parser.parse_args()
+
+    if args.command != "add" and not os.path.exists(args.db_path):
+        print(f"Error: no corpus index at {args.db_path}")
+        sys.exit(1)
+
+    conn = open_index(args.db_path)
+    try:
+        if args.command == "add":
+            for path in args.paths:
+                result = index_document(conn, path, force=args.force)
+                if result is None:
+                    print(f"⏭️ {path} is already indexed")
+                else:
+                    print(f"✅ Indexed {result[1]} lines from {path}")
+        elif args.command == "search":
+            flags = re.IGNORECASE if args.ignore_case else 0
+            if args.pages_only:
+                names = dict(conn.execute("SELECT doc_id, name FROM documents"))
+                for doc_id, pages in candidate_pages(conn, args.pattern, flags).items():
+                    print(f"{names[doc_id]}: pages {', '.join(map(str, pages))}")
+            else:
+                matches = search_corpus(conn, args.pattern, flags)
+                for name, page, line, _, line_text in matches:
+                    print(f"{name}  p{page} l{line}  {line_text}")
+                print(f"{len(matches)} matching lines")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
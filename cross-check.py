@@ -1,12 +1,14 @@
 import sys
-import pdfplumber
 import json
+import argparse
 import re
 import traceback
 from collections import defaultdict, Counter
+from pdf_source import open_pdf_stream
+from shards import parse_page_range, page_in_range, resolve_page_range, shard_document, save_shard, count_pages
 
-pdf_path = "./FTSE All-Share Index Fund.pdf"
-output_json_path = "./final_output_pdf_to_json.json"
+DEFAULT_PDF_PATH = "./FTSE All-Share Index Fund.pdf"
+DEFAULT_OUTPUT_JSON_PATH = "./final_output_pdf_to_json.json"
 
 # Group words into lines
 def group_words_by_line(words, tolerance=1.5):
@@ -63,12 +65,16 @@ def get_word_font_info(word, chars):
         "style": style
     }
 
-# Extract structured PDF data
-def extract_pdf_to_json(pdf_path):
+# Extract structured PDF data (source: path, bytes, file object or mmap), optionally for a (first, last) page range
+def extract_pdf_to_json(source, pages=None):
+    import pdfplumber
+
     formatted_data = []
 
-    with pdfplumber.open(pdf_path) as pdf:
+    with open_pdf_stream(source) as stream, pdfplumber.open(stream) as pdf:
         for page_num, page in enumerate(pdf.pages, start=1):
+            if not page_in_range(page_num, pages):
+                continue
             words = page.extract_words(
                 keep_blank_chars=True,
                 x_tolerance=1,
@@ -137,12 +143,28 @@ def extract_pdf_to_json(pdf_path):
 
     return formatted_data
 
-# Run and Save
-try:
-    final_data = extract_pdf_to_json(pdf_path)
-    with open(output_json_path, "w", encoding="utf-8") as f:
-        json.dump(final_data, f, indent=2)
-    print(f"✅ Structured data with per-word font info saved to: {output_json_path}")
-except Exception as e:
-    print("❌ Error occurred while processing PDF:")
-    traceback.print_exc()
+def main():
+    parser = argparse.ArgumentParser(description="Extract line blocks with per-word font info to JSON")
+    parser.add_argument("pdf_path", nargs="?", default=DEFAULT_PDF_PATH)
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_JSON_PATH)
+    parser.add_argument("--pages", type=parse_page_range, default=None,
+                        help="only extract pages A-B and write a mergeable shard (see 'shards.py merge')")
+    args = parser.parse_args()
+
+    try:
+        final_data = extract_pdf_to_json(args.pdf_path, pages=args.pages)
+        if args.pages:
+            page_count = count_pages(args.pdf_path)
+            save_shard(shard_document("lines", resolve_page_range(args.pages, page_count), page_count, final_data), args.output)
+            return
+
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(final_data, f, indent=2)
+        print(f"✅ Structured data with per-word font info saved to: {args.output}")
+    except Exception as e:
+        print("❌ Error occurred while processing PDF:")
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import json
+import argparse
 
 def find_best_matching_header(headers, x0, x1):
     best_match = None
@@ -32,7 +33,11 @@ def extract_headers(json_data):
 
 # ====== MAIN ======
 if __name__ == "__main__":
-    with open("./JSON_FTSE_ALL_SHARE_INDEX_EXTRACTED.json", "r") as file:  # Replace with your JSON filename
+    parser = argparse.ArgumentParser(description="Find which header column an x0/x1 span belongs to")
+    parser.add_argument("json_path", nargs="?", default="./JSON_FTSE_ALL_SHARE_INDEX_EXTRACTED.json")
+    args = parser.parse_args()
+
+    with open(args.json_path, "r") as file:
         data = json.load(file)
 
     # Step 1: Extract headers with coordinates
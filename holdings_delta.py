@@ -0,0 +1,155 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from security_names import normalize_security_names
+
+# Load the table rows of one report as a DataFrame with H1..Hn / page_number columns, from a previous
+# Excel output, a PDF or a cached JSON/JSONL extraction (the last two go through the table stage)
+def load_table_rows(path, request_model):
+    import pandas as pd
+
+    if path.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(path), request_model.get("headers")
+
+    from backup import extract_by_line_text, resolve_header_lines, extract_table_rows
+
+    if path.lower().endswith(".pdf"):
+        from backup import extract_pdf_to_json
+
+        blocks = extract_pdf_to_json(path, font_detail="none")
+    else:
+        from json_to_text import iter_line_blocks
+
+        blocks = list(iter_line_blocks(path))
+
+    extracted = extract_by_line_text(blocks, request_model["start_regex"], request_model["end_regex"])
+    header_lines = resolve_header_lines(extracted, request_model)
+    rows = extract_table_rows(extracted, request_model, header_lines)
+    if rows is None:
+        raise ValueError(f"No table region or header lines found in {path}")
+    return pd.DataFrame(rows), header_lines
+
+# Positions of one report: rows with a security name and a holding, numeric columns typed and named
+# after their headers. Returns the frame and the names of the numeric columns.
+def position_frame(rows, header_lines, request_model):
+    import pandas as pd
+    from backup import resolve_column_schema, parse_numeric_column
+
+    labels = [f"H{i+1}" for i in range(len(header_lines))] if isinstance(header_lines, list) else \
+        [column for column in rows.columns if re.fullmatch(r"H\d+", str(column))]
+    names = {label: header["text"] for label, header in zip(labels, header_lines)} if isinstance(header_lines, list) \
+        else {label: label for label in labels}
+
+    schema = request_model.get("schema") or {}
+    column_types = resolve_column_schema(header_lines, schema) if isinstance(header_lines, list) else {
+        column: column_type for column, column_type in schema.items() if column in labels
+    }
+    numeric = [label for label in labels if column_types.get(label, "text") != "text"]
+    if not numeric:
+        raise ValueError("The request model schema has no numeric (int/decimal/percent) columns to compare")
+
+    security_column = request_model.get("security_column")
+    security_label = next((label for label in labels if names[label] == security_column), labels[0])
+    holding_label = next((label for label in numeric if column_types[label] == "int"), numeric[0])
+
+    frame = pd.DataFrame({"security": rows[security_label], "page": rows.get("page_number")})
+    for label in numeric:
+        values = rows[label]
+        if values.dtype == object:
+            values = parse_numeric_column(values.to_numpy(), column_types[label], column=names[label])
+        frame[names[label]] = values.astype("float64")
+
+    frame = frame[frame["security"].notna() & frame[names[holding_label]].notna()].copy()
+    frame["key"] = normalize_security_names(frame["security"])
+    frame = frame[frame["key"] != ""]
+    # A name listed twice (share classes with the same text) is matched by its order of appearance
+    frame["occurrence"] = frame.groupby("key").cumcount()
+    return frame, [names[label] for label in numeric]
+
+# Added / removed / changed positions between two reports, joined on normalized name in one hash join
+def holdings_delta(previous, current, numeric_columns):
+    import numpy as np
+
+    merged = previous.merge(current, on=["key", "occurrence"], how="outer", suffixes=("_previous", "_current"),
+                            indicator=True, sort=False)
+
+    delta = merged[["key"]].copy()
+    delta["security"] = merged["security_current"].fillna(merged["security_previous"])
+    delta["status"] = merged["_merge"].map({"left_only": "removed", "right_only": "added", "both": "unchanged"})
+    delta["status"] = delta["status"].astype(object)
+
+    changed = np.zeros(len(merged), dtype=bool)
+    for column in numeric_columns:
+        before = merged[f"{column}_previous"]
+        after = merged[f"{column}_current"]
+        delta[f"{column}_previous"] = before
+        delta[f"{column}_current"] = after
+        delta[f"{column}_delta"] = after.fillna(0) - before.fillna(0)
+        changed |= ((before != after) & ~(before.isna() & after.isna())).to_numpy()
+
+    delta.loc[(delta["status"] == "unchanged") & changed, "status"] = "changed"
+    return delta.drop(columns="key").reset_index(drop=True)
+
+# Write the delta as Excel (one sheet per status), CSV or JSON, picked from the file extension
+def save_delta(delta, output_path):
+    import pandas as pd
+
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension in (".xlsx", ".xls"):
+        with pd.ExcelWriter(output_path) as writer:
+            for status in ("added", "removed", "changed"):
+                delta[delta["status"] == status].to_excel(writer, sheet_name=status, index=False)
+    elif extension == ".csv":
+        delta.to_csv(output_path, index=False)
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(json.loads(delta.to_json(orient="records")), f, indent=2)
+    print(f"Saved delta to {output_path} ✅")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the holdings of two reports: added, removed and changed positions")
+    parser.add_argument("previous", help="previous report: Excel output, PDF or cached JSON/JSONL extraction")
+    parser.add_argument("current", help="current report, in any of the same forms")
+    parser.add_argument("request_model", help="name of the request model to use")
+    parser.add_argument("request_model_json", help="JSON file containing the request models")
+    parser.add_argument("-o", "--output", default=None, help="write the delta to .xlsx, .csv or .json")
+    parser.add_argument("--include-unchanged", action="store_true", help="keep unchanged positions in the output")
+    args = parser.parse_args()
+
+    with open(args.request_model_json, "r") as f:
+        request_models = json.load(f)
+    request_model = next((model for model in request_models if model["request_model"] == args.request_model), None)
+    if not request_model:
+        print(f"Error: Request model '{args.request_model}' not found.")
+        sys.exit(1)
+
+    try:
+        previous, previous_headers = load_table_rows(args.previous, request_model)
+        current, current_headers = load_table_rows(args.current, request_model)
+
+        start = time.perf_counter()
+        previous, numeric_columns = position_frame(previous, previous_headers, request_model)
+        current, _ = position_frame(current, current_headers, request_model)
+        delta = holdings_delta(previous, current, numeric_columns)
+        elapsed = time.perf_counter() - start
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    counts = delta["status"].value_counts()
+    print(f"{len(previous)} → {len(current)} positions: {counts.get('added', 0)} added, {counts.get('removed', 0)} removed, "
+          f"{counts.get('changed', 0)} changed, {counts.get('unchanged', 0)} unchanged ({elapsed * 1000:.1f} ms)")
+
+    if not args.include_unchanged:
+        delta = delta[delta["status"] != "unchanged"]
+    if args.output:
+        save_delta(delta, args.output)
+    else:
+        for row in delta.itertuples(index=False):
+            print(f"{row.status:>9}  {row.security}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pdf_source import open_pdf_stream
+from security_names import SECURITY_MARKERS
+
+# One row per extracted table row, keyed by (source PDF hash, request model, page, row). Cells keep
+# every column under its header text; security and report_date are pulled out so they can be indexed.
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source_sha256 TEXT NOT NULL,
+    request_model TEXT NOT NULL,
+    source_name TEXT,
+    report_date TEXT,
+    run_id TEXT NOT NULL,
+    extracted_at TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (source_sha256, request_model)
+);
+
+CREATE TABLE IF NOT EXISTS holdings (
+    source_sha256 TEXT NOT NULL,
+    request_model TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    report_date TEXT,
+    security TEXT COLLATE NOCASE,
+    cells TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    PRIMARY KEY (source_sha256, request_model, page, row)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_holdings_security ON holdings (security, report_date);
+CREATE INDEX IF NOT EXISTS idx_holdings_report_date ON holdings (report_date);
+"""
+
+UPSERT_HOLDING = """
+INSERT INTO holdings (source_sha256, request_model, page, row, report_date, security, cells, run_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (source_sha256, request_model, page, row) DO UPDATE SET
+    report_date = excluded.report_date,
+    security = excluded.security,
+    cells = excluded.cells,
+    run_id = excluded.run_id
+"""
+
+UPSERT_SOURCE = """
+INSERT INTO sources (source_sha256, request_model, source_name, report_date, run_id, extracted_at, row_count)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (source_sha256, request_model) DO UPDATE SET
+    source_name = excluded.source_name,
+    report_date = excluded.report_date,
+    run_id = excluded.run_id,
+    extracted_at = excluded.extracted_at,
+    row_count = excluded.row_count
+"""
+
+# Date formats seen in fund reports: "15 May 2024", "15 May 24", "15.5.24", "15/05/2024", ISO
+REPORT_DATE_FORMATS = ("%d %B %Y", "%d %b %Y", "%d %B %y", "%d.%m.%y", "%d.%m.%Y", "%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d")
+
+# Open (and create if needed) a holdings store
+def open_store(db_path):
+    conn = sqlite3.connect(db_path)
+    # WAL lets readers query the store while an extraction run is writing to it
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(STORE_SCHEMA)
+    return conn
+
+# SHA-256 of a PDF source (path, bytes, file object or mmap), read in chunks
+def source_sha256(source, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open_pdf_stream(source) as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Parse a report date in any of REPORT_DATE_FORMATS into ISO form (YYYY-MM-DD)
+def parse_report_date(text):
+    text = re.sub(r"\s+", " ", text.strip().rstrip("."))
+    for date_format in REPORT_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised report date '{text}'")
+
+# Report date from the first line block matching the request model's report_date_regex (first group)
+def find_report_date(blocks, pattern):
+    for block in blocks:
+        match = re.search(pattern, block.get("line_text", ""))
+        if match:
+            return parse_report_date(match.group(1) if match.groups() else match.group(0))
+    return None
+
+# Security name as indexed: whitespace and leading footnote markers removed (cells keep the raw text)
+def security_key(name):
+    if not isinstance(name, str):
+        return name
+    return name.strip().lstrip(SECURITY_MARKERS).strip() or None
+
+# JSON for numpy / pandas scalars that the table stage may leave in typed rows
+def json_scalar(value):
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+# Turn table rows (a list of dicts or a typed DataFrame) into holdings parameter tuples.
+# Rows are numbered per page in extraction order, starting at 1.
+def holdings_records(results, header_lines, source_hash, request_model_name, report_date, run_id,
+                     security_column=None):
+    if hasattr(results, "to_dict"):
+        results = results.astype(object).where(results.notna(), None).to_dict("records")
+
+    labels = {f"H{i+1}": header["text"] for i, header in enumerate(header_lines)}
+    security_label = next(
+        (label for label, text in labels.items() if text == security_column),
+        "H1"
+    )
+
+    records = []
+    row_numbers = {}
+    for result in results:
+        page = int(result["page_number"])
+        row_numbers[page] = row_numbers.get(page, 0) + 1
+        cells = {labels[label]: result.get(label) for label in labels}
+        records.append((
+            source_hash, request_model_name, page, row_numbers[page], report_date,
+            security_key(result.get(security_label)),
+            json.dumps(cells, default=json_scalar), run_id
+        ))
+    return records
+
+# Bulk upsert one extraction run in a single transaction. Rows a previous run of the same
+# source/model wrote but this one did not are removed, so re-runs never leave stale rows behind.
+def save_results_to_sqlite(results, header_lines, db_path, source, request_model, report_date=None):
+    source_hash = source_sha256(source)
+    extracted_at = datetime.now(timezone.utc).isoformat()
+    run_id = f"{extracted_at}-{os.getpid()}"
+    records = holdings_records(
+        results, header_lines, source_hash, request_model["request_model"], report_date, run_id,
+        security_column=request_model.get("security_column")
+    )
+    source_name = os.path.basename(source) if isinstance(source, (str, os.PathLike)) else None
+
+    conn = open_store(db_path)
+    try:
+        with conn:
+            conn.executemany(UPSERT_HOLDING, records)
+            conn.execute(
+                "DELETE FROM holdings WHERE source_sha256 = ? AND request_model = ? AND run_id != ?",
+                (source_hash, request_model["request_model"], run_id)
+            )
+            conn.execute(UPSERT_SOURCE, (
+                source_hash, request_model["request_model"], source_name, report_date, run_id,
+                extracted_at, len(records)
+            ))
+    finally:
+        conn.close()
+
+    print(f"Saved {len(records)} rows to {db_path} ✅")
+    return len(records)
+
+# Holdings of one security across every stored report, newest first (exact, case-insensitive),
+# or every security containing the text when like is set
+def find_holdings(conn, security, like=False):
+    if like:
+        where, value = "h.security LIKE ?", f"%{security}%"
+    else:
+        where, value = "h.security = ?", security
+    return conn.execute(f"""
+        SELECT h.report_date, s.source_name, h.request_model, h.page, h.row, h.security, h.cells
+        FROM holdings h JOIN sources s USING (source_sha256, request_model)
+        WHERE {where}
+        ORDER BY h.report_date DESC, s.source_name, h.page, h.row
+    """, (value,)).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the SQLite holdings store written by backup.py --sqlite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="list the holdings of a security across reports")
+    query.add_argument("db_path")
+    query.add_argument("security")
+    query.add_argument("--like", action="store_true", help="match securities containing the text")
+
+    args = parser.parse_args()
+
+    if args.command == "query":
+        if not os.path.exists(args.db_path):
+            print(f"Error: no holdings store at {args.db_path}")
+            sys.exit(1)
+        conn = open_store(args.db_path)
+        try:
+            rows = find_holdings(conn, args.security, like=args.like)
+        finally:
+            conn.close()
+
+        for report_date, source_name, request_model, page, row, security, cells in rows:
+            print(f"{report_date or '-'}  {source_name or '-'}  p{page} r{row}  {security}  {cells}")
+        print(f"{len(rows)} rows")
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,123 @@
 import json
-from collections import defaultdict
-
-# Load the JSON
-with open("./extracted_data.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# Config
-tolerance = 2
-char_width = 4  # Approx. width of one character in coordinate space
-
-# Helper: group words by vertical 'top' (line detection)
-def group_words_by_line(words, tolerance):
-    lines = defaultdict(list)
-    for word in words:
-        top = word['top']
-        matched = False
-        for key in lines:
-            if abs(top - key) <= tolerance:
-                lines[key].append(word)
-                matched = True
-                break
-        if not matched:
-            lines[top].append(word)
-    return lines
-
-# Build text layout with spacing based on x0
-output_lines = []
-for page in data:
-    word_lines = group_words_by_line(page['words'], tolerance)
-    for top in sorted(word_lines.keys()):
-        words = sorted(word_lines[top], key=lambda w: w['x0'])
-        
-        # Estimate line width
-        max_x = int(max(w['x1'] for w in words) / char_width) + 10
-        line = [" "] * max_x
-
-        
-        for word in words:
-            x_index = int(word['x0'] / char_width)
-            text = word['text']
-            # Place text in line, respecting positions
-            for i, char in enumerate(text):
-                if x_index + i < len(line):
-                    line[x_index + i] = char
-
-        output_lines.append("".join(line).rstrip())
-    output_lines.append("\n")
-
-# Write to text file
-with open("text_file_json_to_text_01.txt", "w", encoding="utf-8") as f:
-    f.write("\n".join(output_lines))
-
-print("Grid-style text saved to reconstructed_grid_text.txt")
+import argparse
+from itertools import groupby
+
+DEFAULT_INPUT_JSON_PATH = "./extracted_data.json"
+DEFAULT_OUTPUT_TEXT_PATH = "text_file_json_to_text_01.txt"
+
+# Used only for pages without any words to measure
+DEFAULT_CHAR_WIDTH = 4
+
+# Read line blocks from a JSON list, a {"text_lines": [...]} document or a JSON Lines stream
+def iter_line_blocks(json_path):
+    if json_path.endswith(".jsonl"):
+        with open(json_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    yield from data["text_lines"] if isinstance(data, dict) else data
+
+# Median glyph width (x-extent / character count) per font size over a set of line blocks.
+# Blocks extracted without font info fall back to the line height as their size.
+def glyph_widths_by_size(blocks):
+    import numpy as np
+
+    widths, sizes, counts = [], [], []
+    for block in blocks:
+        block_size = (block.get("font") or {}).get("size")
+        for word in block.get("words", []):
+            length = len(word["text"])
+            if not length:
+                continue
+            size = (word.get("font") or {}).get("size") or block_size or round(word["bottom"] - word["top"], 1)
+            widths.append((word["x1"] - word["x0"]) / length)
+            sizes.append(size)
+            counts.append(length)
+
+    if not widths:
+        return {}
+
+    widths = np.asarray(widths, dtype=float)
+    sizes = np.asarray(sizes, dtype=float)
+    counts = np.asarray(counts, dtype=float)
+    unique_sizes, inverse = np.unique(sizes, return_inverse=True)
+    glyphs = np.bincount(inverse, weights=counts)
+    return {
+        float(size): (float(np.median(widths[inverse == i])), int(glyphs[i]))
+        for i, size in enumerate(unique_sizes)
+    }
+
+# Grid cell width: the median glyph width of the font size that carries most of the text
+def grid_char_width(blocks):
+    widths = glyph_widths_by_size(blocks)
+    if not widths:
+        return DEFAULT_CHAR_WIDTH
+    width, _ = max(widths.values(), key=lambda item: item[1])
+    return width if width > 0 else DEFAULT_CHAR_WIDTH
+
+# Lay out one page of line blocks on a character grid, computing all word columns at once
+def render_page_lines(blocks, char_width):
+    import numpy as np
+
+    lines = [sorted(block.get("words", []), key=lambda w: w["x0"]) for block in blocks]
+    lines = [words for words in lines if words]
+    if not lines:
+        return []
+
+    texts = [word["text"] for words in lines for word in words]
+    per_line = np.fromiter((len(words) for words in lines), dtype=np.int64, count=len(lines))
+    x0 = np.fromiter((word["x0"] for words in lines for word in words), dtype=float, count=len(texts))
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+
+    line_index = np.repeat(np.arange(len(lines)), per_line)
+    line_starts = np.cumsum(per_line) - per_line
+    columns = np.maximum(np.rint(x0 / char_width).astype(np.int64), 0)
+
+    # Keep at least one space after each word: placed[i] = S[i] + max over earlier words j in the
+    # same line of (columns[j] - S[j]), S being the within-line prefix sum of (length + 1).
+    # A per-line offset stops the running maximum from leaking across lines.
+    steps = lengths + 1
+    prefix = np.cumsum(steps) - steps
+    prefix -= np.repeat(prefix[line_starts], per_line)
+    offset = line_index * (int(columns.max()) + int(prefix.max()) + 1)
+    placed = np.maximum.accumulate(columns - prefix + offset) - offset + prefix
+
+    pads = placed - np.concatenate(([0], (placed + lengths)[:-1]))
+    pads[line_starts] = placed[line_starts]
+
+    output_lines = []
+    for start, count in zip(line_starts.tolist(), per_line.tolist()):
+        pieces = [" " * pad + text for pad, text in zip(pads[start:start + count].tolist(), texts[start:start + count])]
+        output_lines.append("".join(pieces).rstrip())
+    return output_lines
+
+# Render line blocks page by page, writing each page to the output as soon as it is laid out
+def write_grid_text(blocks, output_path):
+    pages = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        for _, page_blocks in groupby(blocks, key=lambda block: block.get("page")):
+            page_blocks = list(page_blocks)
+            for line in render_page_lines(page_blocks, grid_char_width(page_blocks)):
+                f.write(line)
+                f.write("\n")
+            f.write("\n\n")
+            pages += 1
+    return pages
+
+def main():
+    parser = argparse.ArgumentParser(description="Render extracted line blocks as grid-style layout text")
+    parser.add_argument("json_path", nargs="?", default=DEFAULT_INPUT_JSON_PATH,
+                        help="line blocks as JSON, {\"text_lines\": [...]} or JSON Lines (.jsonl)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_TEXT_PATH)
+    args = parser.parse_args()
+
+    pages = write_grid_text(iter_line_blocks(args.json_path), args.output)
+
+    print(f"Grid-style text for {pages} pages saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
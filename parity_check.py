@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import importlib.util
+from statistics import median
+
+DEFAULT_PDF_PATH = "./FTSE All-Share Index Fund.pdf"
+DEFAULT_REQUEST_MODEL = "ftse_all_share_portfolio_statement"
+DEFAULT_REQUEST_MODEL_JSON = "./request_models.json"
+
+# Which extractor reproduces which bundled reference output. "ignore" lists key paths (dot-joined,
+# list positions left out) that the extractor does not produce or that the golden file got wrong.
+# "extra" lists keys the extractor adds that the golden file does not have; where it has them they are compared.
+# A case with "reference" instead of "golden" compares against the same script run with those kwargs.
+GOLDEN_CASES = [
+    # No fonts or bounding box, and the line top/bottom are the leftmost word's rather than the line extent
+    {"script": "pdf_to_json.py", "golden": "extracted_data.json", "ignore": ("bounding_box", "font", "top", "bottom")},
+    {"script": "pdf_to_json_with_extra_100.py", "golden": "extracted_data.json"},
+    {"script": "backup.py", "kwargs": {"font_detail": "line"}, "golden": "extracted_data.json"},
+    {"script": "backup.py", "kwargs": {"font_detail": "line", "single_pass": True}, "golden": "extracted_data.json"},
+    # Word fonts as the golden file has them; its line style is a char majority, backup.py's is the first char's
+    {"script": "backup.py", "kwargs": {"font_detail": "word", "single_pass": True},
+     "golden": "final_output_pdf_to_json.json", "ignore": ("font.style",)},
+    {"script": "backup.py", "kwargs": {"font_detail": "span", "single_pass": True},
+     "golden": "final_output_pdf_to_json.json", "ignore": ("font.style", "words.spans")},
+    # No golden file has spans: single pass against the char search
+    {"script": "backup.py", "kwargs": {"font_detail": "span", "single_pass": True}, "reference": {"font_detail": "span"}},
+    {"script": "cross-check.py", "golden": "final_output_pdf_to_json.json"},
+    {"script": "pdf_table_extractor_backup.py", "kwargs": {"font_detail": "word"}, "golden": "final_output_pdf_to_json.json"},
+    # Written by an earlier line-style detector: 12 lines carry a different style string. It has no word fonts
+    # (the final_output_pdf_to_json.json case checks those); line font names and sizes are still compared.
+    {"script": "cross-check.py", "golden": "pdfPlumber_to_json_font_style.json", "ignore": ("font.style",),
+     "extra": ("words.font",)},
+    {"script": "fitz.py", "golden": "may_12_output_final.json"}
+]
+
+# Line blocks the table stage is checked against: the golden word-level extraction
+TABLE_GOLDEN = "final_output_pdf_to_json.json"
+
+# Import a script by file name under its own module name ("cross-check.py" is not importable by name,
+# and fitz.py would otherwise collide with PyMuPDF's legacy "fitz" module)
+def load_script(script):
+    name = "parity_" + os.path.splitext(os.path.basename(script))[0].replace("-", "_")
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, script)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+def load_golden(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["text_lines"] if isinstance(data, dict) else data
+
+# Call fn runs times, returning its last result and the median wall time
+def timed(fn, runs):
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    return result, median(seconds)
+
+# Field-by-field differences between two JSON-like values, as (path, expected, actual).
+# Numbers compare within tolerance; ints and floats are interchangeable.
+def compare_values(expected, actual, tolerance=1e-6, ignore=(), path="", key_path="", extra=()):
+    if key_path in ignore:
+        return
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)) \
+            and not isinstance(expected, bool) and not isinstance(actual, bool):
+        if not math.isclose(expected, actual, rel_tol=1e-9, abs_tol=tolerance):
+            yield path, expected, actual
+    elif isinstance(expected, dict) and isinstance(actual, dict):
+        for key in list(expected) + [key for key in actual if key not in expected]:
+            child_key_path = f"{key_path}.{key}" if key_path else key
+            if child_key_path in ignore:
+                continue
+            if key not in expected and child_key_path in extra:
+                continue
+            if key not in actual or key not in expected:
+                yield f"{path}.{key}", expected.get(key, "<missing>"), actual.get(key, "<missing>")
+            else:
+                yield from compare_values(expected[key], actual[key], tolerance, ignore, f"{path}.{key}", child_key_path,
+                                          extra)
+    elif isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            yield f"{path}.length", len(expected), len(actual)
+        for i, (expected_item, actual_item) in enumerate(zip(expected, actual)):
+            yield from compare_values(expected_item, actual_item, tolerance, ignore, f"{path}[{i}]", key_path, extra)
+    elif expected != actual:
+        yield path, expected, actual
+
+# Table stage rows as plain records (typed DataFrames are converted, missing values become None)
+def table_records(blocks, request_model):
+    from backup import extract_by_line_text, extract_table_rows
+
+    extracted = extract_by_line_text(blocks, request_model["start_regex"], request_model["end_regex"])
+    rows = extract_table_rows(extracted, request_model)
+    if rows is None:
+        return []
+    if hasattr(rows, "to_dict"):
+        rows = rows.astype(object).where(rows.notna(), None).to_dict("records")
+    return rows
+
+# Re-run every golden case (each extractor once per distinct kwargs) plus the table stage.
+# Returns {case name: {"diffs": [...], "seconds": float, "lines": int}}.
+def run_parity(pdf_path, request_model, runs=1, tolerance=1e-6):
+    results = {}
+    outputs = {}
+
+    # Each extractor runs once per distinct kwargs: (output, median seconds, label)
+    def run_extractor(script, kwargs):
+        run_key = (script, json.dumps(kwargs, sort_keys=True))
+        if run_key not in outputs:
+            module = load_script(script)
+            label = script + "".join(f" {key}={value}" for key, value in kwargs.items())
+            outputs[run_key] = timed(lambda: module.extract_pdf_to_json(pdf_path, **kwargs), runs) + (label,)
+        return outputs[run_key]
+
+    for case in GOLDEN_CASES:
+        actual, seconds, label = run_extractor(case["script"], case.get("kwargs", {}))
+        if "reference" in case:
+            golden, _, golden_name = run_extractor(case["script"], case["reference"])
+        else:
+            golden, golden_name = load_golden(case["golden"]), case["golden"]
+        results[f"{label} vs {golden_name}"] = {
+            "diffs": list(compare_values(golden, actual, tolerance, set(case.get("ignore", ())),
+                                         extra=set(case.get("extra", ())))),
+            "seconds": seconds,
+            "lines": len(actual)
+        }
+
+    # Table stage: the full backup.py path on the PDF against the same stage on golden line blocks
+    from backup import extract_pdf_to_json
+
+    expected = table_records(load_golden(TABLE_GOLDEN), request_model)
+    actual, seconds = timed(
+        lambda: table_records(extract_pdf_to_json(pdf_path, font_detail="none"), request_model), runs
+    )
+    results[f"backup.py table stage vs {TABLE_GOLDEN}"] = {
+        "diffs": list(compare_values(expected, actual, tolerance)),
+        "seconds": seconds,
+        "lines": len(actual)
+    }
+
+    # Same stage with word segmentation cropped to the table region
+    region = (request_model["start_regex"], request_model["end_regex"])
+    actual, seconds = timed(
+        lambda: table_records(extract_pdf_to_json(pdf_path, font_detail="none", region=region), request_model), runs
+    )
+    results[f"backup.py cropped table stage vs {TABLE_GOLDEN}"] = {
+        "diffs": list(compare_values(expected, actual, tolerance)),
+        "seconds": seconds,
+        "lines": len(actual)
+    }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every extractor against the bundled golden outputs, and time it")
+    parser.add_argument("pdf_path", nargs="?", default=DEFAULT_PDF_PATH)
+    parser.add_argument("--request-model", default=DEFAULT_REQUEST_MODEL)
+    parser.add_argument("--request-model-json", default=DEFAULT_REQUEST_MODEL_JSON)
+    parser.add_argument("--runs", type=int, default=1, help="timed runs per extractor (median is reported)")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="absolute tolerance for numbers")
+    parser.add_argument("--max-diffs", type=int, default=5, help="differences shown per case")
+    parser.add_argument("--baseline", default=None, help="timings JSON from --save-baseline to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=1.10,
+                        help="fail a case that is this many times slower than the baseline")
+    parser.add_argument("--save-baseline", default=None, help="write this run's timings as a baseline")
+    args = parser.parse_args()
+
+    with open(args.request_model_json, "r") as f:
+        request_model = next((model for model in json.load(f) if model["request_model"] == args.request_model), None)
+    if not request_model:
+        print(f"Error: Request model '{args.request_model}' not found.")
+        sys.exit(1)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_parity(args.pdf_path, request_model, runs=args.runs, tolerance=args.tolerance)
+
+    all_ok = True
+    for name, result in results.items():
+        ok = not result["diffs"]
+        timing = f"{result['seconds']:.2f}s"
+        if name in baseline:
+            ratio = result["seconds"] / baseline[name]
+            timing += f" ({ratio:.2f}x baseline)"
+            ok = ok and ratio <= args.max_slowdown
+        all_ok = all_ok and ok
+        print(f"{'✅' if ok else '❌'} {name}: {result['lines']} rows, {len(result['diffs'])} differences, {timing}")
+        for path, expected, actual in result["diffs"][:args.max_diffs]:
+            print(f"   {path or '<root>'}: expected {expected!r}, got {actual!r}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({name: result["seconds"] for name, result in results.items()}, f, indent=2)
+        print(f"Timings saved to {args.save_baseline}")
+
+    if not all_ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import io
+import os
+import mmap
+from contextlib import contextmanager
+
+# Files at least this large are memory-mapped instead of being read through a file object
+MMAP_THRESHOLD_BYTES = 8 * 1024 * 1024
+
+# True for anything that already behaves like a seekable binary stream (file objects, BytesIO, mmap)
+def is_stream(source):
+    return hasattr(source, "read") and hasattr(source, "seek")
+
+# Open any supported PDF input (path, bytes, file object or mmap) as a seekable binary stream
+@contextmanager
+def open_pdf_stream(source, mmap_threshold=MMAP_THRESHOLD_BYTES):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size and size >= mmap_threshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield mapped
+            else:
+                yield f
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    elif is_stream(source):
+        source.seek(0)
+        yield source
+    else:
+        raise TypeError(f"Unsupported PDF source: {type(source).__name__}")
+
+# Open a PyMuPDF document from the same kinds of input, without writing temp files
+@contextmanager
+def open_fitz_document(source):
+    import pymupdf
+
+    if isinstance(source, (str, os.PathLike)):
+        with pymupdf.open(source) as doc:
+            yield doc
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        with pymupdf.open(stream=source, filetype="pdf") as doc:
+            yield doc
+    elif isinstance(source, mmap.mmap):
+        with memoryview(source) as view, pymupdf.open(stream=view, filetype="pdf") as doc:
+            yield doc
+    elif is_stream(source):
+        # Leave the position untouched, the stream may be shared with an open pdfplumber document
+        position = source.tell()
+        source.seek(0)
+        data = source.read()
+        source.seek(position)
+        with pymupdf.open(stream=data, filetype="pdf") as doc:
+            yield doc
+    else:
+        raise TypeError(f"Unsupported PDF source: {type(source).__name__}")
@@ -1,10 +1,11 @@
 import sys
-import pdfplumber
 import json
 import re
-import pandas as pd
+import argparse
 import traceback
 from collections import  *
+from pdf_source import open_pdf_stream
+from shards import parse_page_range, page_in_range, resolve_page_range, shard_document, save_shard, count_pages
 
 # Group words into lines
 def group_words_by_line(words, tolerance=1.5):
@@ -61,12 +62,18 @@ def get_word_font_info(word, chars):
         "style": style
     }
 
-# Extract structured PDF data
-def extract_pdf_to_json(pdf_path):
+# Extract structured PDF data (source: path, bytes, file object or mmap)
+# font_detail: "none" skips all char work, "line" adds line fonts, "word" (default) adds per-word fonts too
+# pages optionally limits extraction to a 1-based inclusive (first, last) range
+def extract_pdf_to_json(source, font_detail="word", pages=None):
+    import pdfplumber
+
     formatted_data = []
 
-    with pdfplumber.open(pdf_path) as pdf:
+    with open_pdf_stream(source) as stream, pdfplumber.open(stream) as pdf:
         for page_num, page in enumerate(pdf.pages, start=1):
+            if not page_in_range(page_num, pages):
+                continue
             words = page.extract_words(
                 keep_blank_chars=True,
                 x_tolerance=1,
@@ -74,7 +81,7 @@ def extract_pdf_to_json(pdf_path):
                 use_text_flow=True
             )
             grouped_lines = group_words_by_line(words)
-            chars = page.chars
+            chars = page.chars if font_detail != "none" else []
 
             for top_key in sorted(grouped_lines):
                 line_words = sorted(grouped_lines[top_key], key=lambda w: w['x0'])
@@ -125,11 +132,13 @@ def extract_pdf_to_json(pdf_path):
                             "x1": w["x1"],
                             "top": w["top"],
                             "bottom": w["bottom"],
-                            "font": get_word_font_info(w, chars)
+                            **({"font": get_word_font_info(w, line_chars)} if font_detail == "word" else {})
                         }
                         for w in line_words
                     ]
                 }
+                if font_detail == "none":
+                    del line_block["font"]
 
                 formatted_data.append(line_block)
 
@@ -246,6 +255,8 @@ def process_page_headers(results, header_each_page="yes", header_row=(11, 14)):
 
 
 def save_results_to_excel(results, excel_path):
+    import pandas as pd
+
     df = pd.DataFrame(results)
     df.to_excel(excel_path, index=False)
     print(f"Saved successfully to {excel_path} ✅")
@@ -271,14 +282,26 @@ def find_valid_header_lines(data):
     return []  # Return empty list if no matching header is found
 
 def main():
-    if len(sys.argv) != 5:
-        print("\nUsage:\npython script.py <pdf_input_path> <excel_output_path> <request_model> <request_model_json>\n")
-        sys.exit(1)
-
-    pdf_input_path = sys.argv[1]
-    excel_output_path = sys.argv[2]
-    request_model_name = sys.argv[3]  # This is the request model name
-    request_model_path = sys.argv[4]
+    parser = argparse.ArgumentParser(description="Extract a table from a PDF into Excel using a request model")
+    parser.add_argument("pdf_input_path")
+    parser.add_argument("excel_output_path")
+    parser.add_argument("request_model", help="name of the request model to use")
+    parser.add_argument("request_model_json", help="JSON file containing the request models")
+    parser.add_argument("--pages", type=parse_page_range, default=None,
+                        help="only extract pages A-B (1-based, inclusive; 'A-' runs to the end); needs --shard-output")
+    parser.add_argument("--shard-output", default=None,
+                        help="write a mergeable shard for --pages instead of Excel (see 'shards.py merge')")
+    args = parser.parse_args()
+
+    # The header rows to drop depend on the region's real first page, which a page range may not contain,
+    # so a range is only ever written as a shard and the table stage runs on the merged region
+    if args.pages and not args.shard_output:
+        parser.error("--pages writes a shard; give --shard-output and merge the shards with 'shards.py merge'")
+
+    pdf_input_path = args.pdf_input_path
+    excel_output_path = args.excel_output_path
+    request_model_name = args.request_model  # This is the request model name
+    request_model_path = args.request_model_json
 
     try:
         # Load the request model JSON
@@ -296,7 +319,25 @@ def main():
         end_regex = request_model["end_regex"]
         header_lines = request_model["headers"]
 
-        full_data = extract_pdf_to_json(pdf_input_path)
+        full_data = extract_pdf_to_json(pdf_input_path, font_detail="none", pages=args.pages)
+
+        if args.shard_output:
+            from backup import find_region_matches
+
+            # This script leaves cells as text, so the merge must not apply the model's column schema
+            shard_model = {key: value for key, value in request_model.items() if key != "schema"}
+            page_count = count_pages(pdf_input_path)
+            shard = shard_document(
+                "table",
+                resolve_page_range(args.pages, page_count),
+                page_count,
+                full_data,
+                header_state=find_region_matches(full_data, start_regex, end_regex),
+                request_model=shard_model
+            )
+            save_shard(shard, args.shard_output)
+            return
+
         extracted = extract_by_line_text(full_data, start_regex, end_regex)
 
         if header_lines:
@@ -1,13 +1,13 @@
-import pdfplumber
 import json
+import argparse
 from collections import defaultdict
+from pdf_source import open_pdf_stream
+from shards import parse_page_range, page_in_range, resolve_page_range, shard_document, save_shard, count_pages
 
-pdf_path = "./FTSE All-Share Index Fund.pdf"
-output_json_path = "./extracted_data.json"
+DEFAULT_PDF_PATH = "./FTSE All-Share Index Fund.pdf"
+DEFAULT_OUTPUT_JSON_PATH = "./extracted_data.json"
 
 
-formatted_data = []
-
 def group_words_by_line(words, tolerance=1.5):
     lines = defaultdict(list)
     for word in words:
@@ -15,41 +15,69 @@ def group_words_by_line(words, tolerance=1.5):
         lines[top_key].append(word)
     return lines
 
-with pdfplumber.open(pdf_path) as pdf:
-    for page_num, page in enumerate(pdf.pages, start=1):
-        words = page.extract_words(
-            keep_blank_chars=True,
-            x_tolerance=1,
-            y_tolerance=1,
-            use_text_flow=True
-        )
-
-        grouped_lines = group_words_by_line(words)
-
-        for top_key in sorted(grouped_lines):
-            line_words = sorted(grouped_lines[top_key], key=lambda w: w['x0'])
-            line_text = " ".join([w['text'] for w in line_words])
-            line_block = {
-                "page": page_num,
-                "line_text": line_text,
-                "line_spacing": 20.0,
-                "top": line_words[0]['top'],
-                "bottom": line_words[0]['bottom'],
-                "words": [
-                    {
-                        "text": w["text"],
-                        "x0": w["x0"],
-                        "x1": w["x1"],
-                        "top": w["top"],
-                        "bottom": w["bottom"]
-                    }
-                    for w in line_words
-                ]
-            }
-            formatted_data.append(line_block)
-
-# Save to JSON
-with open(output_json_path, "w", encoding="utf-8") as f:
-    json.dump(formatted_data, f, indent=2)
-
-print(f"Formatted PDF data saved to {output_json_path}")
+# Extract line blocks (source: path, bytes, file object or mmap), optionally for a (first, last) page range
+def extract_pdf_to_json(source, pages=None):
+    import pdfplumber
+
+    formatted_data = []
+
+    with open_pdf_stream(source) as stream, pdfplumber.open(stream) as pdf:
+        for page_num, page in enumerate(pdf.pages, start=1):
+            if not page_in_range(page_num, pages):
+                continue
+            words = page.extract_words(
+                keep_blank_chars=True,
+                x_tolerance=1,
+                y_tolerance=1,
+                use_text_flow=True
+            )
+
+            grouped_lines = group_words_by_line(words)
+
+            for top_key in sorted(grouped_lines):
+                line_words = sorted(grouped_lines[top_key], key=lambda w: w['x0'])
+                line_text = " ".join([w['text'] for w in line_words])
+                line_block = {
+                    "page": page_num,
+                    "line_text": line_text,
+                    "line_spacing": 20.0,
+                    "top": line_words[0]['top'],
+                    "bottom": line_words[0]['bottom'],
+                    "words": [
+                        {
+                            "text": w["text"],
+                            "x0": w["x0"],
+                            "x1": w["x1"],
+                            "top": w["top"],
+                            "bottom": w["bottom"]
+                        }
+                        for w in line_words
+                    ]
+                }
+                formatted_data.append(line_block)
+
+    return formatted_data
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract line blocks from a PDF to JSON")
+    parser.add_argument("pdf_path", nargs="?", default=DEFAULT_PDF_PATH)
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_JSON_PATH)
+    parser.add_argument("--pages", type=parse_page_range, default=None,
+                        help="only extract pages A-B and write a mergeable shard (see 'shards.py merge')")
+    args = parser.parse_args()
+
+    formatted_data = extract_pdf_to_json(args.pdf_path, pages=args.pages)
+
+    if args.pages:
+        page_count = count_pages(args.pdf_path)
+        save_shard(shard_document("lines", resolve_page_range(args.pages, page_count), page_count, formatted_data), args.output)
+        return
+
+    # Save to JSON
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(formatted_data, f, indent=2)
+
+    print(f"Formatted PDF data saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
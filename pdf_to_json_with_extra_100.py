@@ -1,9 +1,12 @@
-import pdfplumber
 import json
+import argparse
 from collections import defaultdict
 import re 
-pdf_path = "./FTSE All-Share Index Fund.pdf"
-output_json_path = "./may_12_output_1.json"
+from pdf_source import open_pdf_stream
+from shards import parse_page_range, page_in_range, resolve_page_range, shard_document, save_shard, count_pages
+
+DEFAULT_PDF_PATH = "./FTSE All-Share Index Fund.pdf"
+DEFAULT_OUTPUT_JSON_PATH = "./may_12_output_1.json"
 
 # Group words into lines
 def group_words_by_line(words, tolerance=1.5):
@@ -13,6 +16,21 @@ def group_words_by_line(words, tolerance=1.5):
         lines[top_key].append(word)
     return lines
 
+# Font style detection
+def detect_font_style(font_name):
+    font_lower = font_name.lower()
+    is_bold = "bold" in font_lower or "bd" in font_lower
+    is_italic = "italic" in font_lower or "oblique" in font_lower or "it" in font_lower
+
+    if is_bold and is_italic:
+        return "Bold Italic"
+    elif is_bold:
+        return "Bold"
+    elif is_italic:
+        return "Italic"
+    else:
+        return "Regular"
+
 def infer_style_from_span(span):
     fontname = span.get("font", "").lower()
     flags = span.get("flags", 0)
@@ -37,12 +55,16 @@ def get_dominant_style(spans):
 
     return max(style_counts, key=style_counts.get)
 
-# Extract structured info
-def extract_pdf_to_json(pdf_path):
+# Extract structured info (source: path, bytes, file object or mmap), optionally for a (first, last) page range
+def extract_pdf_to_json(source, pages=None):
+    import pdfplumber
+
     formatted_data = []
 
-    with pdfplumber.open(pdf_path) as pdf:
+    with open_pdf_stream(source) as stream, pdfplumber.open(stream) as pdf:
         for page_num, page in enumerate(pdf.pages, start=1):
+            if not page_in_range(page_num, pages):
+                continue
             words = page.extract_words(
                 keep_blank_chars=True,
                 x_tolerance=1,
@@ -112,9 +134,24 @@ def extract_pdf_to_json(pdf_path):
 
     return formatted_data
 
-# Run & Save Output
-final_data = extract_pdf_to_json(pdf_path)
-with open(output_json_path, "w", encoding="utf-8") as f:
-    json.dump(final_data, f, indent=2)
+def main():
+    parser = argparse.ArgumentParser(description="Extract line blocks with line-level font styles to JSON")
+    parser.add_argument("pdf_path", nargs="?", default=DEFAULT_PDF_PATH)
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_JSON_PATH)
+    parser.add_argument("--pages", type=parse_page_range, default=None,
+                        help="only extract pages A-B and write a mergeable shard (see 'shards.py merge')")
+    args = parser.parse_args()
+
+    final_data = extract_pdf_to_json(args.pdf_path, pages=args.pages)
+    if args.pages:
+        page_count = count_pages(args.pdf_path)
+        save_shard(shard_document("lines", resolve_page_range(args.pages, page_count), page_count, final_data), args.output)
+        return
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(final_data, f, indent=2)
+
+    print(f"Merged structured data with font styles saved to {args.output}")
 
-print(f"Merged structured data with font styles saved to {output_json_path}")
+if __name__ == "__main__":
+    main()
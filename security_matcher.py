@@ -0,0 +1,166 @@
+import sys
+import csv
+import time
+import argparse
+
+DEFAULT_NAME_COLUMN = "name"
+DEFAULT_TOP_K = 3
+DEFAULT_MIN_SCORE = 0.5
+
+# Trigrams of a normalized name, padded so short names and word starts still produce grams
+def name_trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Trigram index over a reference list of security names, built once. Candidates are scored with the
+# Dice coefficient of their trigram sets: 2·|shared| / (|query| + |reference|), from 0 to 1.
+class SecurityMatcher:
+    def __init__(self, names, ids=None):
+        import numpy as np
+        import pandas as pd
+        from security_names import normalize_security_names
+
+        self.names = list(names)
+        self.ids = list(ids) if ids is not None else list(range(len(self.names)))
+        self.keys = normalize_security_names(pd.Series(self.names, dtype=object)).tolist()
+
+        postings = {}
+        sizes = np.zeros(len(self.keys), dtype=np.int32)
+        for ref_id, key in enumerate(self.keys):
+            grams = name_trigrams(key) if key else set()
+            sizes[ref_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(ref_id)
+        self.postings = {gram: np.asarray(ids_, dtype=np.int32) for gram, ids_ in postings.items()}
+        self.sizes = sizes
+
+    @classmethod
+    def from_csv(cls, csv_path, name_column=DEFAULT_NAME_COLUMN, id_column=None):
+        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            if name_column not in (reader.fieldnames or []):
+                raise ValueError(f"Reference CSV {csv_path} has no '{name_column}' column")
+            if id_column and id_column not in reader.fieldnames:
+                raise ValueError(f"Reference CSV {csv_path} has no '{id_column}' column")
+            rows = [row for row in reader if row[name_column]]
+        return cls(
+            [row[name_column] for row in rows],
+            [row[id_column] for row in rows] if id_column else None
+        )
+
+    # Top-k reference entries for one already-normalized name, as (id, name, score), best first
+    def match_key(self, key, top_k=DEFAULT_TOP_K, min_score=0.0):
+        import numpy as np
+
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}")
+        grams = [self.postings[gram] for gram in name_trigrams(key) if gram in self.postings] if key else []
+        if not grams:
+            return []
+        query_size = len(name_trigrams(key))
+
+        candidates, shared = np.unique(np.concatenate(grams), return_counts=True)
+        scores = 2.0 * shared / (query_size + self.sizes[candidates])
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [
+            (self.ids[candidates[i]], self.names[candidates[i]], round(float(scores[i]), 4))
+            for i in best if scores[i] >= min_score
+        ]
+
+    # Top-k candidates for many names; identical names are looked up once
+    def match_many(self, names, top_k=DEFAULT_TOP_K, min_score=0.0):
+        import pandas as pd
+        from security_names import normalize_security_names
+
+        keys = normalize_security_names(pd.Series(list(names), dtype=object)).tolist()
+        cache = {}
+        results = []
+        for key in keys:
+            if key not in cache:
+                cache[key] = self.match_key(key, top_k, min_score)
+            results.append(cache[key])
+        return results
+
+# Matcher stage for table rows (list of dicts or DataFrame): adds the best match's id, name and score
+# for the security column, plus the other top-k candidates as "name (score)" text
+def add_security_matches(results, security_label, matcher, top_k=DEFAULT_TOP_K, min_score=DEFAULT_MIN_SCORE):
+    is_frame = hasattr(results, "to_dict")
+    names = results[security_label].tolist() if is_frame else [row.get(security_label) for row in results]
+    matches = matcher.match_many([name or "" for name in names], top_k, min_score)
+
+    columns = {
+        "match_id": [found[0][0] if found else None for found in matches],
+        "match_name": [found[0][1] if found else None for found in matches],
+        "match_score": [found[0][2] if found else None for found in matches]
+    }
+    if top_k > 1:
+        columns["match_candidates"] = [
+            "; ".join(f"{name} ({score:.2f})" for _, name, score in found[1:]) or None for found in matches
+        ]
+
+    if is_frame:
+        results = results.copy()
+        for column, values in columns.items():
+            results[column] = values
+        return results
+    return [dict(row, **{column: values[i] for column, values in columns.items()}) for i, row in enumerate(results)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Match extracted security names against a reference CSV")
+    parser.add_argument("reference_csv")
+    parser.add_argument("input_path", help="Excel output of backup.py, or a text file with one name per line")
+    parser.add_argument("-o", "--output", default=None, help="Excel output (default: print the matches)")
+    parser.add_argument("--name-column", default=DEFAULT_NAME_COLUMN)
+    parser.add_argument("--id-column", default=None)
+    parser.add_argument("--column", default="H1", help="security column of the Excel input")
+    parser.add_argument("-k", "--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE)
+    args = parser.parse_args()
+
+    if args.top_k < 1:
+        parser.error("--top-k must be at least 1")
+
+    try:
+        start = time.perf_counter()
+        matcher = SecurityMatcher.from_csv(args.reference_csv, args.name_column, args.id_column)
+        built = time.perf_counter() - start
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.input_path.lower().endswith((".xlsx", ".xls")):
+        import pandas as pd
+
+        table = pd.read_excel(args.input_path)
+        names = table[args.column].fillna("").astype(str).tolist()
+    else:
+        table = None
+        with open(args.input_path, "r", encoding="utf-8") as f:
+            names = [line.strip() for line in f if line.strip()]
+
+    start = time.perf_counter()
+    if args.output:
+        import pandas as pd
+
+        if table is None:
+            table = pd.DataFrame({args.column: names})
+        matched = add_security_matches(table, args.column, matcher, args.top_k, args.min_score)
+    else:
+        matches = matcher.match_many(names, args.top_k, args.min_score)
+    elapsed = time.perf_counter() - start
+    print(f"Indexed {len(matcher.names)} reference names in {built:.2f}s, matched {len(names)} names in {elapsed:.2f}s")
+
+    if args.output:
+        matched.to_excel(args.output, index=False)
+        print(f"Saved successfully to {args.output} ✅")
+    else:
+        for name, found in zip(names, matches):
+            best = f"{found[0][1]} ({found[0][2]:.2f})" if found else "-"
+            print(f"{name}  →  {best}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# Footnote markers the portfolio statement puts in front of some security names ("+HSBC Holdings")
+SECURITY_MARKERS = "^#+*~†‡"
+
+# Security names as join keys: footnote markers, case, punctuation and spacing are ignored and
+# "&" matches "and" ("+Rolls-Royce Holdings" and "ROLLS ROYCE  HOLDINGS" give the same key)
+def normalize_security_names(names):
+    return (
+        names.fillna("").astype(str)
+        .str.normalize("NFKC")
+        .str.strip()
+        .str.lstrip(SECURITY_MARKERS)
+        .str.casefold()
+        .str.replace("&", " and ", regex=False)
+        .str.replace(r"[^\w\s]", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
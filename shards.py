@@ -0,0 +1,156 @@
+import re
+import sys
+import json
+import argparse
+
+# Parse a 1-based inclusive page range: "A-B", "A-" (to the end) or "A"
+def parse_page_range(text):
+    match = re.fullmatch(r"\s*(\d+)\s*(?:(-)\s*(\d*)\s*)?", text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid page range '{text}', expected A-B, A- or A")
+
+    first = int(match.group(1))
+    if match.group(3):
+        last = int(match.group(3))
+    elif match.group(2):
+        last = None
+    else:
+        last = first
+
+    if first < 1 or (last is not None and last < first):
+        raise argparse.ArgumentTypeError(f"invalid page range '{text}'")
+    return first, last
+
+# True when a 1-based page number falls inside an optional (first, last) range
+def page_in_range(page_num, pages):
+    if pages is None:
+        return True
+    first, last = pages
+    return page_num >= first and (last is None or page_num <= last)
+
+# Clamp an optional range to the document, giving a concrete (first, last)
+def resolve_page_range(pages, page_count):
+    if pages is None:
+        return 1, page_count
+    first, last = pages
+    return first, page_count if last is None else min(last, page_count)
+
+# Number of pages in a PDF source, via PyMuPDF when available (fast) or pdfplumber
+def count_pages(source):
+    from pdf_source import open_pdf_stream, open_fitz_document
+
+    try:
+        with open_fitz_document(source) as doc:
+            return doc.page_count
+    except ImportError:
+        import pdfplumber
+
+        with open_pdf_stream(source) as stream, pdfplumber.open(stream) as pdf:
+            return len(pdf.pages)
+
+# Wrap the line blocks of one page range into a shard document
+def shard_document(kind, pages, page_count, text_lines, header_state=None, **extra):
+    document = {"shard": {"kind": kind, "pages": list(pages), "page_count": page_count, **extra}}
+    if header_state is not None:
+        document["header_state"] = header_state
+    document["text_lines"] = text_lines
+    return document
+
+# Save a shard document
+def save_shard(document, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    first, last = document["shard"]["pages"]
+    print(f"✅ Shard for pages {first}-{last} saved to {path}")
+
+# Load shard documents, check they are of one kind and tile the document without gaps or overlaps
+def load_shards(paths):
+    shards = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            shards.append(json.load(f))
+    shards.sort(key=lambda shard: shard["shard"]["pages"][0])
+
+    kinds = {shard["shard"]["kind"] for shard in shards}
+    if len(kinds) != 1:
+        raise ValueError(f"Cannot merge shards of different kinds: {', '.join(sorted(kinds))}")
+
+    page_count = shards[0]["shard"]["page_count"]
+    expected_first = 1
+    for shard in shards:
+        first, last = shard["shard"]["pages"]
+        if shard["shard"]["page_count"] != page_count:
+            raise ValueError("Shards come from documents with different page counts")
+        if first != expected_first:
+            raise ValueError(f"Shards do not tile the document: expected page {expected_first}, got {first}-{last}")
+        expected_first = last + 1
+    if expected_first != page_count + 1:
+        raise ValueError(f"Shards stop at page {expected_first - 1} of {page_count}")
+
+    return shards
+
+# Stitch the line blocks of ordered shards back together
+def merge_text_lines(shards):
+    return [block for shard in shards for block in shard["text_lines"]]
+
+# Stitch table shards: concatenate blocks and rebuild the region from the regex matches each shard
+# recorded, exactly as extract_by_line_text would have found it in a single run
+def merge_table_region(shards):
+    blocks, start_matches, end_matches = [], [], []
+    for shard in shards:
+        offset = len(blocks)
+        blocks.extend(shard["text_lines"])
+        start_matches.extend(offset + i for i in shard["header_state"]["start_matches"])
+        end_matches.extend(offset + i for i in shard["header_state"]["end_matches"])
+
+    if not start_matches:
+        return []
+    start_idx = start_matches[0]
+    end_idx = next((i for i in end_matches if i > start_idx), None)
+    if end_idx is None:
+        return []
+    return blocks[start_idx:end_idx + 1]
+
+# Merge shard files into the output a single run would have produced
+def merge_shards(paths, output_path):
+    shards = load_shards(paths)
+    kind = shards[0]["shard"]["kind"]
+
+    if kind == "lines":
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(merge_text_lines(shards), f, indent=2)
+        print(f"✅ Merged {len(shards)} shards into {output_path}")
+    elif kind == "table":
+        from backup import extract_table_rows, save_results_to_excel
+
+        request_model = shards[0]["shard"]["request_model"]
+        if any(shard["shard"]["request_model"] != request_model for shard in shards):
+            raise ValueError("Shards were extracted with different request models")
+
+        final_results = extract_table_rows(merge_table_region(shards), request_model)
+        if final_results is None:
+            print("⚠️ No table region or header lines found. Nothing to extract.")
+        else:
+            save_results_to_excel(final_results, output_path)
+    else:
+        raise ValueError(f"Unknown shard kind '{kind}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Work with page-range shards of an extraction run")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    merge = commands.add_parser("merge", help="stitch shard files back into the single-run output")
+    merge.add_argument("output_path", help="JSON for line shards, Excel for table shards")
+    merge.add_argument("shard_paths", nargs="+")
+
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        try:
+            merge_shards(args.shard_paths, args.output_path)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import os
+import sys
+import json
+import time
+import ctypes
+import select
+import signal
+import struct
+import argparse
+from collections import deque
+from datetime import datetime, timezone
+from atomic_io import atomic_output, write_json_atomic
+
+DEFAULT_STATE_FILE = ".watch_state.json"
+DEFAULT_STATUS_FILE = "watch_status.json"
+
+# inotify event bits (linux/inotify.h): a file finished writing or was moved into the directory
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT = struct.Struct("iIII")
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+# Only finished PDFs count; dot-files are temporary copies (ours or an uploader's)
+def is_candidate(path):
+    name = os.path.basename(path)
+    return name.lower().endswith(".pdf") and not name.startswith(".") and os.path.isfile(path)
+
+def list_candidates(directory):
+    return sorted(
+        entry.path for entry in os.scandir(directory)
+        if is_candidate(entry.path)
+    )
+
+# Watch a directory with inotify (Linux) for files that were closed after writing or moved in
+class InotifyWatcher:
+    name = "inotify"
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.directory = directory
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if name:
+                paths.append(os.path.join(self.directory, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+# Polling fallback: a file is reported once its size and mtime stayed the same for one interval
+class PollingWatcher:
+    name = "polling"
+
+    def __init__(self, directory, interval=2.0):
+        self.directory = directory
+        self.interval = interval
+        self.last_scan = 0.0
+        self.previous = {}
+        self.reported = {}
+
+    def seed(self, paths):
+        for path in paths:
+            signature = self.signature(path)
+            if signature:
+                self.previous[path] = self.reported[path] = signature
+
+    def signature(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def poll(self, timeout):
+        wait = self.last_scan + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if wait > timeout:
+                return []
+        self.last_scan = time.monotonic()
+
+        current = {path: self.signature(path) for path in list_candidates(self.directory)}
+        stable = [
+            path for path, signature in current.items()
+            if signature and self.previous.get(path) == signature and self.reported.get(path) != signature
+        ]
+        for path in stable:
+            self.reported[path] = current[path]
+        self.previous = current
+        return stable
+
+    def close(self):
+        pass
+
+def open_watcher(directory, poll_interval, force_polling=False):
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️ inotify unavailable ({e}), falling back to polling every {poll_interval}s")
+    return PollingWatcher(directory, poll_interval)
+
+# Worker: extract the PDF once, then run every request model on the same line blocks. Outputs go to
+# output_dir/<stem>-<hash prefix>/<request model>.xlsx and are written atomically.
+def process_pdf(path, source_hash, output_dir, request_models, page_timeout=None, sqlite_path=None):
+    from backup import (extract_pdf_to_json, extract_by_line_text, resolve_header_lines, extract_table_rows,
+                        save_results_to_excel)
+
+    start = time.perf_counter()
+    blocks = extract_pdf_to_json(path, page_timeout=page_timeout, font_detail="none")
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    document_dir = os.path.join(output_dir, f"{stem}-{source_hash[:12]}")
+    os.makedirs(document_dir, exist_ok=True)
+
+    outputs = {}
+    for request_model in request_models:
+        name = request_model["request_model"]
+        extracted = extract_by_line_text(blocks, request_model["start_regex"], request_model["end_regex"])
+        header_lines = resolve_header_lines(extracted, request_model)
+        final_results = extract_table_rows(extracted, request_model, header_lines)
+        if final_results is None:
+            outputs[name] = None
+            continue
+
+        excel_path = os.path.join(document_dir, f"{name}.xlsx")
+        with atomic_output(excel_path) as tmp_path:
+            save_results_to_excel(final_results, tmp_path, quiet=True)
+        print(f"Saved successfully to {excel_path} ✅")
+        outputs[name] = excel_path
+
+        if sqlite_path:
+            from holdings_store import save_results_to_sqlite, find_report_date
+
+            report_date = None
+            if request_model.get("report_date_regex"):
+                report_date = find_report_date(extracted, request_model["report_date_regex"])
+            save_results_to_sqlite(final_results, header_lines, sqlite_path, path, request_model,
+                                   report_date=report_date)
+
+    return {"outputs": outputs, "lines": len(blocks), "seconds": time.perf_counter() - start}
+
+class WatchDaemon:
+    def __init__(self, watch_dir, output_dir, request_models, concurrency=2, poll_interval=2.0,
+                 state_path=None, status_path=None, page_timeout=None, sqlite_path=None, force_polling=False,
+                 max_tasks_per_worker=None, rss_limit_mb=None):
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.request_models = request_models
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.state_path = state_path or os.path.join(output_dir, DEFAULT_STATE_FILE)
+        self.status_path = status_path or os.path.join(output_dir, DEFAULT_STATUS_FILE)
+        self.page_timeout = page_timeout
+        self.sqlite_path = sqlite_path
+        self.force_polling = force_polling
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.rss_limit_mb = rss_limit_mb
+        self.pool = None
+
+        self.state = self.load_state()
+        self.pending = deque()
+        self.in_flight = {}
+        self.queued_hashes = set()
+        self.failed_hashes = set()
+        self.stats = {"completed": 0, "failed": 0, "duplicates": 0, "busy_seconds": 0.0}
+        self.started_at = time.monotonic()
+        self.started_at_utc = utc_now()
+        self.stopping = False
+        self.watcher = None
+
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"completed": {}, "failed": {}}
+
+    # Queue a file unless its content was already completed, is queued or is being processed. A file that
+    # failed is not retried until the daemon restarts (failures such as a killed worker can be transient).
+    def enqueue(self, path):
+        if not is_candidate(path):
+            return
+        from holdings_store import source_sha256
+
+        try:
+            source_hash = source_sha256(path)
+        except FileNotFoundError:
+            return
+        if (source_hash in self.state["completed"] or source_hash in self.failed_hashes
+                or source_hash in self.queued_hashes):
+            self.stats["duplicates"] += 1
+            return
+        self.queued_hashes.add(source_hash)
+        self.pending.append((path, source_hash))
+
+    def submit_pending(self):
+        while self.pending and len(self.in_flight) < self.concurrency and not self.stopping:
+            path, source_hash = self.pending.popleft()
+            future = self.pool.submit(
+                process_pdf, path, source_hash, self.output_dir, self.request_models, label=os.path.basename(path),
+                page_timeout=self.page_timeout, sqlite_path=self.sqlite_path
+            )
+            self.in_flight[future] = (path, source_hash, time.monotonic())
+            print(f"▶️ Processing {os.path.basename(path)}")
+
+    def collect_finished(self):
+        finished = [future for future in self.in_flight if future.done()]
+        for future in finished:
+            path, source_hash, started = self.in_flight.pop(future)
+            self.queued_hashes.discard(source_hash)
+            self.stats["busy_seconds"] += time.monotonic() - started
+            entry = {"name": os.path.basename(path), "finished_at": utc_now()}
+            try:
+                entry.update(future.result())
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+                self.state["failed"][source_hash] = entry
+                self.failed_hashes.add(source_hash)
+                self.stats["failed"] += 1
+                print(f"❌ {entry['name']} failed: {entry['error']}")
+            else:
+                self.state["completed"][source_hash] = entry
+                self.state["failed"].pop(source_hash, None)
+                self.stats["completed"] += 1
+                print(f"✅ {entry['name']} done in {entry['seconds']:.1f}s")
+            # Saved after every file, so a restart only redoes what was queued or in flight
+            write_json_atomic(self.state_path, self.state)
+        return bool(finished)
+
+    def write_status(self):
+        elapsed = time.monotonic() - self.started_at
+        done = self.stats["completed"] + self.stats["failed"]
+        write_json_atomic(self.status_path, {
+            "updated_at": utc_now(),
+            "started_at": self.started_at_utc,
+            "watcher": self.watcher.name if self.watcher else None,
+            "concurrency": self.concurrency,
+            "queue_depth": len(self.pending),
+            "in_flight": [os.path.basename(path) for path, _, _ in self.in_flight.values()],
+            "completed": self.stats["completed"],
+            "failed": self.stats["failed"],
+            "duplicates_skipped": self.stats["duplicates"],
+            "files_per_minute": round(done / elapsed * 60, 2) if elapsed else 0.0,
+            "avg_seconds_per_file": round(self.stats["busy_seconds"] / done, 2) if done else None,
+            "workers": self.pool.worker_stats() if self.pool else []
+        })
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+
+    # Process what is already in the folder, then follow new files until stopped
+    # (or until the queue drains when once is set)
+    def run(self, once=False):
+        from worker_pool import SupervisedPool
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        existing = list_candidates(self.watch_dir)
+        if not once:
+            self.watcher = open_watcher(self.watch_dir, self.poll_interval, self.force_polling)
+            if isinstance(self.watcher, PollingWatcher):
+                self.watcher.seed(existing)
+            print(f"👀 Watching {self.watch_dir} ({self.watcher.name}), {self.concurrency} workers")
+        for path in existing:
+            self.enqueue(path)
+        retried = sum(source_hash in self.state["failed"] for _, source_hash in self.pending)
+        if retried:
+            print(f"🔁 Retrying {retried} file(s) that failed in an earlier run")
+
+        # Workers ignore Ctrl-C (it reaches the whole process group) and are recycled by task count / RSS
+        self.pool = SupervisedPool(self.concurrency, self.max_tasks_per_worker, self.rss_limit_mb)
+        with self.pool:
+            last_status = 0.0
+            while True:
+                self.submit_pending()
+                changed = self.collect_finished()
+
+                if self.stopping or (once and not self.pending):
+                    if not self.in_flight:
+                        break
+                    # Let in-flight files finish; queued ones are picked up again on restart
+                    time.sleep(0.2)
+                elif self.watcher:
+                    for path in self.watcher.poll(timeout=1.0):
+                        self.enqueue(path)
+                else:
+                    time.sleep(0.2)
+
+                if changed or time.monotonic() - last_status >= 5.0:
+                    self.write_status()
+                    last_status = time.monotonic()
+
+        self.write_status()
+        if self.watcher:
+            self.watcher.close()
+        print(f"🛑 Stopped: {self.stats['completed']} completed, {self.stats['failed']} failed, "
+              f"{len(self.pending)} left in the queue")
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a drop folder and extract every new fund PDF")
+    parser.add_argument("watch_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("request_model_json", help="JSON file containing the request models")
+    parser.add_argument("--model", action="append", default=None,
+                        help="only run this request model (repeatable; default: every model in the file)")
+    parser.add_argument("-j", "--concurrency", type=int, default=2, help="PDFs extracted in parallel")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between scans when polling")
+    parser.add_argument("--polling", action="store_true", help="poll even where inotify is available")
+    parser.add_argument("--max-tasks-per-worker", type=int, default=None, help="recycle a worker after this many PDFs")
+    parser.add_argument("--rss-limit-mb", type=float, default=None,
+                        help="restart a worker whose RSS crosses this; its PDF is retried on a fresh worker")
+    parser.add_argument("--state-file", default=None, help=f"default: <output_dir>/{DEFAULT_STATE_FILE}")
+    parser.add_argument("--status-file", default=None, help=f"default: <output_dir>/{DEFAULT_STATUS_FILE}")
+    parser.add_argument("--page-timeout", type=float, default=None,
+                        help="seconds allowed per page before it is re-extracted with PyMuPDF")
+    parser.add_argument("--sqlite", default=None, help="also upsert rows into this SQLite holdings store")
+    parser.add_argument("--once", action="store_true", help="process the files already there and exit")
+    args = parser.parse_args()
+
+    with open(args.request_model_json, "r") as f:
+        request_models = json.load(f)
+    if args.model:
+        unknown = set(args.model) - {model["request_model"] for model in request_models}
+        if unknown:
+            print(f"Error: Request model(s) not found: {', '.join(sorted(unknown))}")
+            sys.exit(1)
+        request_models = [model for model in request_models if model["request_model"] in args.model]
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    daemon = WatchDaemon(
+        args.watch_dir, args.output_dir, request_models,
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        state_path=args.state_file,
+        status_path=args.status_file,
+        page_timeout=args.page_timeout,
+        sqlite_path=args.sqlite,
+        force_polling=args.polling,
+        max_tasks_per_worker=args.max_tasks_per_worker,
+        rss_limit_mb=args.rss_limit_mb
+    )
+    daemon.run(once=args.once)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+from collections import deque
+
+# Memory fields of /proc/<pid>/status: current and peak ("high-water mark") resident set size
+PROC_MEMORY_FIELDS = {"VmRSS:": "rss", "VmHWM:": "hwm"}
+
+class WorkerLost(RuntimeError):
+    pass
+
+class WorkerMemoryExceeded(RuntimeError):
+    pass
+
+# Current and peak RSS of a process in bytes ({"rss": None, "hwm": None} where /proc is unavailable)
+def read_memory(pid):
+    memory = {"rss": None, "hwm": None}
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                fields = line.split()
+                key = PROC_MEMORY_FIELDS.get(fields[0]) if fields else None
+                if key:
+                    memory[key] = int(fields[1]) * 1024
+    except OSError:
+        pass
+    return memory
+
+# Peak RSS of the calling process, falling back to getrusage off Linux
+def own_memory():
+    memory = read_memory(os.getpid())
+    if memory["hwm"] is None:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["hwm"] = peak if sys.platform == "darwin" else peak * 1024
+    return memory
+
+def to_mb(value):
+    return round(value / (1024 * 1024), 1) if value is not None else None
+
+# Worker process: run tasks from the pipe until told to stop, the task budget is used up or RSS
+# stays above the ceiling after a task (fragmented heaps rarely shrink back)
+def worker_main(conn, max_tasks, rss_limit):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    tasks = 0
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        task_id, fn, args, kwargs = message
+        try:
+            reply = ("ok", task_id, fn(*args, **kwargs))
+        except Exception as e:
+            reply = ("error", task_id, e)
+        tasks += 1
+
+        memory = own_memory()
+        recycle = None
+        if max_tasks and tasks >= max_tasks:
+            recycle = f"max tasks ({max_tasks})"
+        elif rss_limit and memory["rss"] and memory["rss"] > rss_limit:
+            recycle = f"RSS {to_mb(memory['rss'])} MB over the ceiling after a task"
+
+        try:
+            conn.send(reply + (memory["hwm"], recycle))
+        except Exception as e:
+            # Unpicklable result or exception: report it as a plain error instead
+            conn.send(("error", task_id, RuntimeError(f"{type(e).__name__}: {e}"), memory["hwm"], recycle))
+        if recycle:
+            break
+    conn.close()
+
+class Task:
+    def __init__(self, task_id, fn, args, kwargs, future, label):
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.label = label
+        self.attempts = 0
+
+class Worker:
+    def __init__(self, worker_id, context, max_tasks, rss_limit):
+        self.worker_id = worker_id
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=worker_main, args=(child_conn, max_tasks, rss_limit), name=f"extract-worker-{worker_id}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.tasks_done = 0
+        self.peak_rss = None
+        self.exit_reason = None
+
+    def note_peak(self, value):
+        if value is not None and (self.peak_rss is None or value > self.peak_rss):
+            self.peak_rss = value
+
+    def stats(self):
+        return {
+            "worker": self.worker_id,
+            "pid": self.process.pid,
+            "tasks": self.tasks_done,
+            "peak_rss_mb": to_mb(self.peak_rss),
+            "exit": self.exit_reason
+        }
+
+# Process pool that recycles workers after max_tasks_per_worker tasks or when their RSS crosses
+# rss_limit_mb. A worker over the ceiling mid-task is killed and the task retried on a fresh
+# worker (up to max_retries times). submit() returns a concurrent.futures.Future.
+class SupervisedPool:
+    def __init__(self, processes=2, max_tasks_per_worker=None, rss_limit_mb=None, max_retries=1,
+                 check_interval=0.5, start_method="spawn"):
+        import multiprocessing
+
+        self.processes = processes
+        self.max_tasks = max_tasks_per_worker
+        self.rss_limit = int(rss_limit_mb * 1024 * 1024) if rss_limit_mb else None
+        self.max_retries = max_retries
+        self.check_interval = check_interval
+        # Workers are started from the supervisor thread, where fork is not safe
+        self.context = multiprocessing.get_context(start_method)
+
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.workers = []
+        self.retired = []
+        self.next_task_id = 0
+        self.next_worker_id = 0
+        self.closing = False
+        self.supervisor = threading.Thread(target=self.supervise, name="pool-supervisor", daemon=True)
+        self.supervisor.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def submit(self, fn, *args, label=None, **kwargs):
+        from concurrent.futures import Future
+
+        future = Future()
+        with self.lock:
+            if self.closing:
+                raise RuntimeError("Cannot submit to a pool that is shutting down")
+            self.next_task_id += 1
+            self.pending.append(Task(self.next_task_id, fn, args, kwargs, future, label or fn.__name__))
+        return future
+
+    # Stop accepting work, let queued and running tasks finish, then stop the workers
+    def shutdown(self):
+        with self.lock:
+            self.closing = True
+        self.supervisor.join()
+
+    def worker_stats(self):
+        with self.lock:
+            return [worker.stats() for worker in self.retired + self.workers]
+
+    def print_report(self):
+        for stats in self.worker_stats():
+            peak = f"{stats['peak_rss_mb']} MB" if stats["peak_rss_mb"] is not None else "unknown"
+            print(f"   worker {stats['worker']} (pid {stats['pid']}): {stats['tasks']} tasks, "
+                  f"peak RSS {peak}{', ' + stats['exit'] if stats['exit'] else ''}")
+
+    def retire(self, worker, reason):
+        worker.exit_reason = reason
+        if worker.process.is_alive():
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+        worker.conn.close()
+        self.workers.remove(worker)
+        self.retired.append(worker)
+
+    # Put a task whose worker died back at the front of the queue, or fail it after max_retries
+    def retry_or_fail(self, task, error):
+        if task.attempts <= self.max_retries:
+            print(f"🔁 Retrying {task.label} on a fresh worker ({error})")
+            self.pending.appendleft(task)
+        else:
+            task.future.set_exception(error)
+
+    def assign(self):
+        idle = [worker for worker in self.workers if worker.task is None]
+        # Grow back to the pool size for queued work only, so an idle pool holds no workers
+        while len(self.pending) > len(idle) and len(self.workers) < self.processes:
+            self.next_worker_id += 1
+            worker = Worker(self.next_worker_id, self.context, self.max_tasks, self.rss_limit)
+            self.workers.append(worker)
+            idle.append(worker)
+
+        for worker in idle:
+            while self.pending:
+                task = self.pending.popleft()
+                if task.attempts == 0 and not task.future.set_running_or_notify_cancel():
+                    continue
+                task.attempts += 1
+                worker.task = task
+                try:
+                    worker.conn.send((task.task_id, task.fn, task.args, task.kwargs))
+                except OSError:
+                    pass  # the worker is gone; its sentinel fires and the task is retried
+                break
+
+    def handle_reply(self, worker):
+        try:
+            status, _, value, hwm, recycle = worker.conn.recv()
+        except (EOFError, OSError):
+            return
+        task, worker.task = worker.task, None
+        worker.tasks_done += 1
+        worker.note_peak(hwm)
+        if status == "ok":
+            task.future.set_result(value)
+        else:
+            task.future.set_exception(value)
+        if recycle:
+            print(f"♻️ Recycling worker {worker.worker_id}: {recycle}")
+            self.retire(worker, recycle)
+
+    def handle_exit(self, worker):
+        worker.process.join()
+        code = worker.process.exitcode
+        task = worker.task
+        self.retire(worker, f"exited with status {code}")
+        if task is not None:
+            self.retry_or_fail(task, WorkerLost(f"worker {worker.worker_id} exited with status {code} during {task.label}"))
+
+    # Sample busy workers' RSS; kill any above the ceiling and retry its task elsewhere
+    def enforce_memory(self):
+        for worker in list(self.workers):
+            memory = read_memory(worker.process.pid)
+            worker.note_peak(memory["hwm"])
+            if self.rss_limit and worker.task and memory["rss"] and memory["rss"] > self.rss_limit:
+                task = worker.task
+                worker.process.kill()
+                reason = f"killed at {to_mb(memory['rss'])} MB RSS (ceiling {to_mb(self.rss_limit)} MB)"
+                print(f"♻️ Worker {worker.worker_id} {reason} while running {task.label}")
+                self.retire(worker, reason)
+                self.retry_or_fail(task, WorkerMemoryExceeded(f"{task.label}: {reason}"))
+
+    def supervise(self):
+        from multiprocessing.connection import wait
+
+        last_check = 0.0
+        while True:
+            with self.lock:
+                self.assign()
+                busy = [worker for worker in self.workers if worker.task is not None]
+                if self.closing and not self.pending and not busy:
+                    break
+
+            waitables = {}
+            for worker in list(self.workers):
+                waitables[worker.conn] = (self.handle_reply, worker)
+                waitables[worker.process.sentinel] = (self.handle_exit, worker)
+            if waitables:
+                ready = wait(list(waitables), timeout=self.check_interval)
+            else:
+                ready = []
+                time.sleep(0.05)
+
+            with self.lock:
+                # Replies first: a worker that answered and then exited to recycle is not a lost task
+                ready.sort(key=lambda handle: waitables[handle][0] == self.handle_exit)
+                for handle in ready:
+                    handler, worker = waitables[handle]
+                    if worker in self.workers:
+                        handler(worker)
+                if time.monotonic() - last_check >= self.check_interval:
+                    self.enforce_memory()
+                    last_check = time.monotonic()
+
+        with self.lock:
+            for worker in list(self.workers):
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+                self.retire(worker, "pool shut down")
+
+# Task for the command line: extract one PDF to a JSON file inside the worker, so the line blocks
+# never have to be pickled back to the parent. With checkpoint, finished pages go to a journal next to
+# the output and a matching journal left by a killed worker is resumed.
+def extract_to_json(pdf_path, output_path, font_detail="line", page_timeout=None, single_pass=False, checkpoint=False):
+    import json
+    from backup import extract_pdf_to_json
+    from atomic_io import atomic_output
+
+    journal = None
+    if checkpoint:
+        from checkpoint import PageJournal
+        from holdings_store import source_sha256
+
+        run = {"source_sha256": source_sha256(pdf_path), "font_detail": font_detail, "page_timeout": page_timeout,
+               "single_pass": single_pass}
+        journal = PageJournal(journal_path(output_path), run, resume=True)
+
+    try:
+        data = extract_pdf_to_json(pdf_path, page_timeout=page_timeout, font_detail=font_detail,
+                                   single_pass=single_pass, journal=journal)
+        with atomic_output(output_path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+    finally:
+        if journal is not None:
+            journal.close()
+    if journal is not None:
+        journal.remove()
+    return len(data)
+
+# One JSON output per PDF in output_dir, named after the PDF. PDFs of the batch that share a file name
+# (x/r.pdf, y/r.pdf) get a hash of their full path added, so the name is unique and stable across runs.
+def output_json_paths(output_dir, pdf_paths):
+    import hashlib
+    from collections import Counter
+
+    stems = [os.path.splitext(os.path.basename(pdf_path))[0] for pdf_path in pdf_paths]
+    counts = Counter(stems)
+    paths = []
+    for pdf_path, stem in zip(pdf_paths, stems):
+        if counts[stem] > 1:
+            stem += "." + hashlib.sha1(os.path.abspath(pdf_path).encode("utf-8")).hexdigest()[:8]
+        paths.append(os.path.join(output_dir, f"{stem}.json"))
+    return paths
+
+def journal_path(output_path):
+    directory, name = os.path.split(output_path)
+    return os.path.join(directory, f".{name}.journal")
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract many PDFs to JSON with recycled, memory-capped workers")
+    parser.add_argument("output_dir")
+    parser.add_argument("pdf_paths", nargs="+")
+    parser.add_argument("-j", "--processes", type=int, default=2)
+    parser.add_argument("--max-tasks-per-worker", type=int, default=None, help="recycle a worker after this many PDFs")
+    parser.add_argument("--rss-limit-mb", type=float, default=None, help="restart a worker whose RSS crosses this")
+    parser.add_argument("--retries", type=int, default=1, help="retries for a PDF whose worker was killed")
+    parser.add_argument("--font-detail", choices=("none", "line", "word", "span"), default="line")
+    parser.add_argument("--page-timeout", type=float, default=None)
+    parser.add_argument("--single-pass", action="store_true", help="take fonts from the word segmentation")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="journal finished pages per PDF; a retried or resumed PDF continues from its journal")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip PDFs whose JSON is already written and resume the others' journals (implies --checkpoint)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    args.checkpoint = args.checkpoint or args.resume
+    # A PDF given twice would write the same output and journal from two workers; run it once
+    pdf_paths, seen = [], set()
+    for pdf_path in args.pdf_paths:
+        if os.path.abspath(pdf_path) not in seen:
+            seen.add(os.path.abspath(pdf_path))
+            pdf_paths.append(pdf_path)
+    if len(pdf_paths) < len(args.pdf_paths):
+        print(f"⚠️ Skipping {len(args.pdf_paths) - len(pdf_paths)} duplicate input(s)")
+    failed = skipped = 0
+    start = time.perf_counter()
+    with SupervisedPool(args.processes, args.max_tasks_per_worker, args.rss_limit_mb, args.retries) as pool:
+        futures = []
+        for pdf_path, output_path in zip(pdf_paths, output_json_paths(args.output_dir, pdf_paths)):
+            if args.resume and os.path.exists(output_path):
+                # Outputs are written atomically, so one that exists is complete
+                skipped += 1
+                continue
+            if args.checkpoint and not args.resume and os.path.exists(journal_path(output_path)):
+                os.remove(journal_path(output_path))
+            futures.append((pdf_path, pool.submit(
+                extract_to_json, pdf_path, output_path, label=os.path.basename(pdf_path),
+                font_detail=args.font_detail, page_timeout=args.page_timeout, single_pass=args.single_pass,
+                checkpoint=args.checkpoint
+            )))
+        for pdf_path, future in futures:
+            try:
+                print(f"✅ {pdf_path}: {future.result()} lines")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {pdf_path}: {type(e).__name__}: {e}")
+
+    print(f"Extracted {len(futures) - failed}/{len(futures)} PDFs in {time.perf_counter() - start:.1f}s"
+          + (f", {skipped} already done" if skipped else ""))
+    pool.print_report()
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()